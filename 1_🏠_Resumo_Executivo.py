@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 # Importa funções de utils.py (certifique-se que utils.py está na raiz)
-from utils import format_currency, format_percentage, load_kpis
+from utils import (format_currency, format_percentage, load_kpis, calcular_previsoes, projecao_anual_empresa,
+                   figura_velocimetro, calcular_alertas, exibir_alertas, alerta_ltv_cac_disparado, versoes_datasets,
+                   META_FATURAMENTO_ANUAL, MESES_PERIODO_ATUAL, seletor_tenant, estatisticas_cache)
 
 # --- Configuração da Página ---
 st.set_page_config(
@@ -20,14 +21,14 @@ st.session_state['exec_mode'] = st.sidebar.toggle(
     value=st.session_state.get('exec_mode', False),
     help="Oculta detalhes e gráficos secundários nas outras páginas para uma visão de alto nível."
 )
+tenant = seletor_tenant()
+with st.sidebar.expander("Uso do Cache de Dados"):
+    st.dataframe(estatisticas_cache(), hide_index=True, use_container_width=True)
 st.sidebar.markdown("---")
 
 # --- Carregar Dados ---
-df_kpis = load_kpis()
-
-# --- Constantes ---
-META_FATURAMENTO_ANUAL = 30000000
-MESES_PERIODO_ATUAL = 6 # Set/22 a Fev/23
+versoes = versoes_datasets(tenant) # Chave do cache: dados novos assim que um CSV muda
+df_kpis = load_kpis(versoes['kpis'], tenant=tenant)
 
 # --- Conteúdo da Página ---
 st.title("🏠 Resumo Executivo | BR Bank")
@@ -57,16 +58,16 @@ if df_kpis is not None:
         projecao_anual = None # Inicializa
         if pd.notna(receita_total_valor):
             gap_meta = META_FATURAMENTO_ANUAL - receita_total_valor
-            projecao_anual = (receita_total_valor / MESES_PERIODO_ATUAL) * 12 if MESES_PERIODO_ATUAL > 0 else 0
+            projecao_anual = projecao_anual_empresa(calcular_previsoes(versoes, tenant=tenant), receita_total_valor)
             col_g2.metric("Gap para Meta Anual",
                           format_currency(gap_meta),
                           help=f"Quanto falta para atingir a meta anual de {format_currency(META_FATURAMENTO_ANUAL)}?")
-            col_g3.metric("Projeção Anual (Linear)",
+            col_g3.metric("Projeção Anual (Tendência)",
                           format_currency(projecao_anual),
-                          help=f"Estimativa de receita anual baseada na média dos últimos {MESES_PERIODO_ATUAL} meses. Estamos no ritmo?")
+                          help=f"Receita realizada no ano + previsão dos meses restantes (tendência e sazonalidade da receita mensal; sem série mensal, usa a média dos últimos {MESES_PERIODO_ATUAL} meses). Estamos no ritmo?")
         else:
             col_g2.metric("Gap para Meta Anual", "N/A", help="Necessário valor da Receita Total.")
-            col_g3.metric("Projeção Anual (Linear)", "N/A", help="Necessário valor da Receita Total.")
+            col_g3.metric("Projeção Anual (Tendência)", "N/A", help="Necessário valor da Receita Total.")
 
         col_g4.metric("Leads Convertidos",
                       f"{int(leads_convertidos_valor):,}" if pd.notna(leads_convertidos_valor) else "N/A",
@@ -75,36 +76,7 @@ if df_kpis is not None:
         # --- Gráfico Velocímetro ---
         if pd.notna(receita_total_valor):
             st.markdown("##### Progresso da Receita vs Meta Anual")
-            # Define cores pastel azul (LightCyan, LightBlue, LightSkyBlue) com alpha
-            cor_step1 = 'rgba(225, 245, 254, 0.6)' # Light Cyan 50 com alpha
-            cor_step2 = 'rgba(179, 229, 252, 0.7)' # Light Blue 100 com alpha
-            cor_step3 = 'rgba(129, 212, 250, 0.8)' # Light Blue 200 com alpha
-            cor_barra = '#81D4FA' # Light Blue 200 sólido
-
-            fig_gauge = go.Figure(go.Indicator(
-                mode = "gauge+number",
-                value = receita_total_valor,
-                number = {'prefix': "R$", 'valueformat': ',.0f'},
-                domain = {'x': [0, 1], 'y': [0, 1]},
-                gauge = {
-                    'axis': {'range': [0, META_FATURAMENTO_ANUAL], 'tickwidth': 1, 'tickcolor': "darkblue"},
-                    'bar': {'color': cor_barra}, # Cor da barra principal
-                    'bgcolor': "white",
-                    'borderwidth': 1,
-                    'bordercolor': "gray",
-                    'steps': [ # Escala de Azul Pastel (claro -> escuro) com transparência
-                        {'range': [0, META_FATURAMENTO_ANUAL * 0.5], 'color': cor_step1},
-                        {'range': [META_FATURAMENTO_ANUAL * 0.5, META_FATURAMENTO_ANUAL * 0.8], 'color': cor_step2},
-                        {'range': [META_FATURAMENTO_ANUAL * 0.8, META_FATURAMENTO_ANUAL], 'color': cor_step3}
-                        ],
-                    'threshold': {
-                        'line': {'color': "orange", 'width': 4}, # Linha laranja para projeção (bom contraste com azul)
-                        'thickness': 0.75,
-                        'value': projecao_anual if pd.notna(projecao_anual) else 0
-                        }
-                    }
-                ))
-            fig_gauge.update_layout(height=250, margin=dict(t=10, b=10, l=30, r=30))
+            fig_gauge = figura_velocimetro(receita_total_valor, projecao_anual, tenant=tenant)
             st.plotly_chart(fig_gauge, use_container_width=True)
         else:
             st.info("Gráfico de progresso não disponível (Receita Total ausente).")
@@ -143,10 +115,10 @@ if df_kpis is not None:
             col_r3.metric("LTV / CAC Ratio",
                           f"{ltv_cac_ratio:.1f}x",
                           help="Relação LTV/CAC. Um valor > 3x geralmente indica aquisição saudável e escalável.")
-            # Adicionar um pequeno comentário interpretativo
-            if ltv_cac_ratio < 3:
-                 st.caption(f"⚠️ A relação LTV/CAC de {ltv_cac_ratio:.1f}x sugere atenção à eficiência dos custos de aquisição ou necessidade de aumentar o LTV.")
-            else:
+            # Comentário interpretativo: alertas das regras (regras_alerta.csv) ou confirmação de saúde
+            df_alertas = calcular_alertas(versoes, tenant=tenant)
+            exibir_alertas(df_alertas, 'Resumo Executivo')
+            if not alerta_ltv_cac_disparado(df_alertas):
                  st.caption(f"✅ A relação LTV/CAC de {ltv_cac_ratio:.1f}x indica uma aquisição saudável.")
         else:
             col_r3.metric("LTV / CAC Ratio", "N/A", help="Não foi possível calcular (LTV ou CAC ausente/inválido).")
@@ -0,0 +1,262 @@
+"""
+Motor de regras de alerta do dashboard.
+
+As regras (regras_alerta.csv) são avaliadas de uma vez contra todos os grupos
+(motivo x vendedor x canal x período) usando comparações vetorizadas sobre os
+DataFrames carregados, em vez de um `if` por alerta em cada página.
+
+Tipos de regra:
+    limiar    -> Valor da métrica comparado ao Limiar
+    razao     -> Métrica / Metrica_Base (mesmo grupo) comparada ao Limiar
+    variacao  -> variação relativa da métrica em relação ao período anterior
+
+Filtros de grupo (colunas Motivo, Vendedor, Canal, Periodo da regra):
+    vazio     -> apenas o agregado ('Todos')
+    '*'       -> cada grupo individualmente (inclusive o agregado)
+    outro     -> apenas o grupo com esse nome
+"""
+import numpy as np
+import pandas as pd
+
+TODOS = 'Todos'
+QUALQUER = '*'
+DIMENSOES = ['Motivo', 'Vendedor', 'Canal', 'Periodo']
+TIPOS = ['limiar', 'razao', 'variacao']
+
+OPERADORES = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+COLUNAS_ALERTAS = ['Regra', 'Pagina', 'Severidade', 'Metrica', *DIMENSOES, 'Valor', 'Limiar', 'Mensagem']
+
+
+# --- Fatos: todos os números do dashboard em formato longo ---
+def _derreter(df, id_vars, nome_coluna_var, nome_metrica=None):
+    id_vars = [c for c in id_vars if c in df.columns]
+    longo = df.melt(id_vars=id_vars, var_name=nome_coluna_var, value_name='Valor')
+    if nome_metrica is not None:
+        longo['Metrica'] = nome_metrica
+    return longo
+
+def montar_fatos(df_kpis=None, df_midia=None, df_performance=None, df_perda=None):
+    # Junta os quatro datasets em uma tabela única: Metrica, Motivo, Vendedor, Canal, Periodo, Valor
+    partes = []
+    if df_kpis is not None:
+        partes.append(df_kpis.reset_index()[['Metrica', 'Valor', *[c for c in DIMENSOES if c in df_kpis.columns]]])
+    if df_midia is not None:
+        partes.append(_derreter(df_midia.reset_index(), ['Metrica', *DIMENSOES], 'Canal'))
+    if df_performance is not None:
+        partes.append(_derreter(df_performance, DIMENSOES, 'Metrica'))
+    if df_perda is not None:
+        perdas = _derreter(df_perda.reset_index(), DIMENSOES, 'Vendedor', nome_metrica='Perdas')
+        perdas['Valor'] = pd.to_numeric(perdas['Valor'], errors='coerce')
+        # Participação de cada motivo nas perdas do vendedor (ou do total)
+        grupo_total = [c for c in ['Vendedor', 'Canal', 'Periodo'] if c in perdas.columns]
+        participacao = perdas.assign(
+            Metrica='Participação nas Perdas',
+            Valor=perdas['Valor'] / perdas.groupby(grupo_total)['Valor'].transform('sum'),
+        )
+        partes += [perdas, participacao]
+
+    if not partes:
+        return pd.DataFrame(columns=['Metrica', *DIMENSOES, 'Valor'])
+    fatos = pd.concat(partes, ignore_index=True)
+    for dim in DIMENSOES:
+        fatos[dim] = fatos[dim].fillna(TODOS).astype(str) if dim in fatos.columns else TODOS
+    # Colunas 'Total' dos CSVs representam o agregado
+    fatos[['Vendedor', 'Canal']] = fatos[['Vendedor', 'Canal']].replace({'Total': TODOS})
+    fatos['Valor'] = pd.to_numeric(fatos['Valor'], errors='coerce')
+    return fatos.dropna(subset=['Valor'])[['Metrica', *DIMENSOES, 'Valor']].reset_index(drop=True)
+
+
+# --- Regras ---
+def preparar_regras(df_regras):
+    # Normaliza a tabela de regras (tipos, filtros vazios -> agregado) e descarta linhas inválidas
+    regras = df_regras.copy()
+    for col in ['Metrica_Base', *DIMENSOES]:
+        if col not in regras.columns:
+            regras[col] = np.nan
+    for dim in DIMENSOES:
+        regras[dim] = regras[dim].fillna(TODOS).astype(str).str.strip().replace({'': TODOS})
+    regras['Tipo'] = regras['Tipo'].fillna('limiar').str.strip().str.lower()
+    regras['Operador'] = regras['Operador'].astype(str).str.strip()
+    regras['Limiar'] = pd.to_numeric(regras['Limiar'], errors='coerce')
+    regras['Severidade'] = regras.get('Severidade', pd.Series('aviso', index=regras.index)).fillna('aviso')
+    validas = (
+        regras['Tipo'].isin(TIPOS)
+        & regras['Operador'].isin(list(OPERADORES))
+        & regras['Limiar'].notna()
+        & regras['Metrica'].notna()
+        & ((regras['Tipo'] != 'razao') | regras['Metrica_Base'].notna())
+    )
+    return regras[validas].reset_index(drop=True)
+
+
+def _fatos_derivados(regras, fatos):
+    # Calcula, uma vez por métrica (ou par de métricas), os valores usados pelas regras
+    # de razão e de variação. Retorna (fatos com coluna 'Chave', chave de cada regra).
+    chave_regra = regras['Metrica'].astype(str)
+    tabelas = [fatos.assign(Chave=fatos['Metrica'])]
+
+    razao = regras['Tipo'] == 'razao'
+    if razao.any():
+        chave_regra = chave_regra.mask(razao, 'razao:' + regras['Metrica'].astype(str) + '/' + regras['Metrica_Base'].astype(str))
+        pares = regras.loc[razao, ['Metrica', 'Metrica_Base']].drop_duplicates()
+        numerador = fatos.merge(pares, on='Metrica')
+        denominador = fatos.rename(columns={'Metrica': 'Metrica_Base', 'Valor': 'Base'})
+        r = numerador.merge(denominador, on=['Metrica_Base', *DIMENSOES])
+        r = r[r['Base'] != 0]
+        r = r.assign(Valor=r['Valor'] / r['Base'], Chave='razao:' + r['Metrica'] + '/' + r['Metrica_Base'])
+        tabelas.append(r[['Metrica', *DIMENSOES, 'Valor', 'Chave']])
+
+    variacao = regras['Tipo'] == 'variacao'
+    if variacao.any():
+        chave_regra = chave_regra.mask(variacao, 'variacao:' + regras['Metrica'].astype(str))
+        v = fatos[fatos['Metrica'].isin(regras.loc[variacao, 'Metrica'].unique()) & (fatos['Periodo'] != TODOS)]
+        v = v.sort_values('Periodo')
+        anterior = v.groupby(['Metrica', 'Motivo', 'Vendedor', 'Canal'])['Valor'].shift(1)
+        v = v.assign(Valor=(v['Valor'] - anterior) / anterior.abs(), Chave='variacao:' + v['Metrica'])
+        v = v[np.isfinite(v['Valor'])]
+        tabelas.append(v[['Metrica', *DIMENSOES, 'Valor', 'Chave']])
+
+    return pd.concat(tabelas, ignore_index=True), chave_regra
+
+
+def _codificar(fatos, regras, coluna, curinga=None):
+    # Converte a coluna em códigos inteiros comuns a fatos e regras (curinga -> -1)
+    codigos, _ = pd.factorize(pd.concat([fatos[coluna], regras[coluna]], ignore_index=True))
+    codigos_fatos, codigos_regras = codigos[:len(fatos)], codigos[len(fatos):].copy()
+    if curinga is not None:
+        codigos_regras[regras[coluna].to_numpy(dtype=object) == curinga] = -1
+    return codigos_fatos, codigos_regras
+
+
+def _combinar(codigos_fatos, codigos_regras, colunas):
+    # Junta várias colunas de códigos em um único código por linha (refatorando a cada
+    # passo para que os valores não cresçam)
+    n = len(codigos_fatos[colunas[0]])
+    chave = np.zeros(n + len(codigos_regras[colunas[0]]), dtype=np.int64)
+    for coluna in colunas:
+        codigo = np.concatenate([codigos_fatos[coluna], codigos_regras[coluna]])
+        chave, _ = pd.factorize(chave * (codigo.max() + 1) + codigo)
+        chave = chave.astype(np.int64)
+    return chave[:n], chave[n:]
+
+
+def _expandir(inicio, fim):
+    # Para intervalos [inicio, fim): (índice do intervalo, posição) de cada elemento
+    quantidade = np.maximum(fim - inicio, 0)
+    idx = np.repeat(np.arange(len(inicio)), quantidade)
+    deslocamento = np.arange(quantidade.sum()) - np.repeat(np.cumsum(quantidade) - quantidade, quantidade)
+    return idx, np.repeat(inicio, quantidade) + deslocamento
+
+
+def _intervalos(operador, lo, hi, g0, g1):
+    # Posições (em fatos ordenados por grupo e valor) que satisfazem 'valor <op> limiar':
+    # [g0, g1) é o grupo do fato, [lo, hi) os valores iguais ao limiar. '!=' usa dois intervalos.
+    return {
+        '>': [(hi, g1)],
+        '>=': [(lo, g1)],
+        '<': [(g0, lo)],
+        '<=': [(g0, hi)],
+        '==': [(lo, hi)],
+        '!=': [(g0, lo), (hi, g1)],
+    }[operador]
+
+
+def avaliar_regras(df_regras, fatos):
+    # Cruza todas as regras com todos os grupos e retorna os alertas disparados.
+    # As regras são separadas pelo conjunto de dimensões curinga ('*'): em cada conjunto, a
+    # junção usa a Chave mais as dimensões fixas da regra, e só as dimensões curinga se
+    # expandem contra os fatos. Dentro de cada grupo da junção os fatos ficam ordenados por
+    # valor, então a comparação com o limiar vira uma busca binária e só os pares que
+    # disparam chegam a ser gerados.
+    regras = preparar_regras(df_regras)
+    if regras.empty or fatos.empty:
+        return pd.DataFrame(columns=COLUNAS_ALERTAS)
+
+    base, chave_regra = _fatos_derivados(regras, fatos)
+    regras = regras.assign(Chave=chave_regra)
+
+    codigos_fatos, codigos_regras = {}, {}
+    for coluna in ['Chave', *DIMENSOES]:
+        curinga = QUALQUER if coluna in DIMENSOES else None
+        codigos_fatos[coluna], codigos_regras[coluna] = _codificar(base, regras, coluna, curinga)
+
+    # Valores e limiares convertidos em postos comuns (valores iguais -> mesmo posto)
+    valor = base['Valor'].to_numpy(dtype=float)
+    limiar = regras['Limiar'].to_numpy(dtype=float)
+    distintos = np.unique(np.concatenate([valor, limiar]))
+    posto_valor = np.searchsorted(distintos, valor)
+    posto_limiar = np.searchsorted(distintos, limiar)
+    n_postos = len(distintos) + 1
+
+    curingas = np.column_stack([codigos_regras[dim] == -1 for dim in DIMENSOES])
+    padroes, padrao_regra = np.unique(curingas, axis=0, return_inverse=True)
+    operadores = regras['Operador'].to_numpy(dtype=object)
+    pares_regra, pares_fato = [], []
+    for p, padrao in enumerate(padroes):
+        sel_regras = np.flatnonzero(padrao_regra.ravel() == p)
+        fixas = ['Chave', *[dim for dim, curinga in zip(DIMENSOES, padrao) if not curinga]]
+        grupo_fatos, grupo_regras = _combinar(
+            codigos_fatos, {c: codigos_regras[c][sel_regras] for c in fixas}, fixas)
+
+        # Fatos ordenados por (grupo, valor) em um único código inteiro
+        chave_fatos = grupo_fatos * n_postos + posto_valor
+        ordem = np.argsort(chave_fatos, kind='stable')
+        ordenados = chave_fatos[ordem]
+        g0 = np.searchsorted(ordenados, grupo_regras * n_postos, side='left')
+        g1 = np.searchsorted(ordenados, (grupo_regras + 1) * n_postos, side='left')
+        lo = np.searchsorted(ordenados, grupo_regras * n_postos + posto_limiar[sel_regras], side='left')
+        hi = np.searchsorted(ordenados, grupo_regras * n_postos + posto_limiar[sel_regras], side='right')
+
+        for simbolo in OPERADORES:
+            sel_op = np.flatnonzero(operadores[sel_regras] == simbolo)
+            if len(sel_op) == 0:
+                continue
+            limites = (lo[sel_op], hi[sel_op], g0[sel_op], g1[sel_op])
+            for inicio, fim in _intervalos(simbolo, *limites):
+                idx, posicao = _expandir(inicio, fim)
+                pares_regra.append(sel_regras[sel_op][idx])
+                pares_fato.append(ordem[posicao])
+
+    idx_regra = np.concatenate(pares_regra) if pares_regra else np.zeros(0, dtype=np.int64)
+    idx_fato = np.concatenate(pares_fato) if pares_fato else np.zeros(0, dtype=np.int64)
+    if len(idx_fato) == 0:
+        return pd.DataFrame(columns=COLUNAS_ALERTAS)
+    ordem = np.lexsort((idx_fato, idx_regra))  # ordem estável: regra, depois fato
+    idx_regra, idx_fato = idx_regra[ordem], idx_fato[ordem]
+
+    regras_disparadas = regras.iloc[idx_regra].reset_index(drop=True)
+    fatos_disparados = base.iloc[idx_fato].reset_index(drop=True)
+    resultado = pd.concat([
+        regras_disparadas[['Regra', 'Pagina', 'Severidade', 'Limiar', 'Mensagem']],
+        fatos_disparados[['Metrica', *DIMENSOES, 'Valor']],
+    ], axis=1)
+    resultado['Mensagem'] = _formatar_mensagens(resultado)
+    return resultado[COLUNAS_ALERTAS]
+
+
+def _formatar_mensagens(resultado):
+    # A mensagem da regra pode usar {valor}, {limiar} e os nomes das dimensões, ex.: {Motivo}.
+    # Modelos sem campos são copiados direto; os demais são formatados linha a linha.
+    modelos = resultado['Mensagem'].where(
+        resultado['Mensagem'].notna(), "Regra '" + resultado['Regra'].astype(str) + "' disparada."
+    )
+    com_campos = np.flatnonzero(modelos.str.contains('{', regex=False).to_numpy(dtype=bool))
+    modelos = modelos.to_numpy(dtype=object)
+    mensagens = modelos.copy()
+    if len(com_campos) == 0:
+        return mensagens
+    colunas = [resultado[c].to_numpy(dtype=object)[com_campos] for c in ['Valor', 'Limiar', *DIMENSOES]]
+    for i, modelo, valor, limiar, *dims in zip(com_campos, modelos[com_campos], *colunas):
+        try:
+            mensagens[i] = modelo.format(valor=valor, limiar=limiar, **dict(zip(DIMENSOES, dims)))
+        except (KeyError, IndexError, ValueError):
+            pass
+    return mensagens
@@ -0,0 +1,233 @@
+"""
+API HTTP somente leitura com as mesmas métricas exibidas no dashboard.
+
+Permite que outros sistemas (ferramentas de BI, jobs de alerta) consumam os números
+sem abrir o Streamlit nem disparar um rerun do script. Reutiliza os loaders de utils.py.
+
+Uso:
+    python api.py --porta 8502 --threads 8
+
+Rotas:
+    GET /api                       -> índice com os datasets disponíveis e suas versões
+    GET /api/<dataset>             -> dados em JSON (padrão)
+    GET /api/<dataset>.csv         -> dados em CSV (também aceita ?formato=csv)
+    GET /api/tenants               -> tenants disponíveis
+    GET /api/cache                 -> uso do cache de dados e respostas por tenant (acertos, faltas, remoções, recusas)
+
+Todas as rotas de dados aceitam ?tenant=<nome> (padrão: utils.TENANT_PADRAO).
+
+As respostas serializadas ficam no mesmo cache dos loaders (utils.cache_dados), por tenant e
+versão dos CSVs de origem, e contam nos mesmos orçamentos de memória (ver /api/cache). Trazem
+ETag: clientes que enviam If-None-Match recebem 304 enquanto os dados não mudarem.
+"""
+import argparse
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import utils
+
+
+# --- Datasets Expostos ---
+def _kpis(versoes, tenant):
+    return utils.load_kpis(versoes['kpis'], tenant=tenant)
+
+def _midia(versoes, tenant):
+    return utils.load_midia(versoes['midia'], tenant=tenant)
+
+def _performance(versoes, tenant):
+    return utils.load_performance(versoes['performance'], tenant=tenant)
+
+def _perda(versoes, tenant):
+    return utils.load_perda(versoes['perda'], tenant=tenant)
+
+def _ranking_vendedores(versoes, tenant):
+    df = utils.load_performance(versoes['performance'], tenant=tenant)
+    return utils.calcular_ranking_vendedores(df) if df is not None else None
+
+def _perdas_por_motivo(versoes, tenant):
+    df = utils.load_perda(versoes['perda'], tenant=tenant)
+    return utils.calcular_perdas_por_motivo(df) if df is not None else None
+
+def _alertas(versoes, tenant):
+    return utils.calcular_alertas(versoes, tenant=tenant)
+
+def _previsoes(versoes, tenant):
+    return utils.calcular_previsoes(versoes, tenant=tenant)
+
+def _leads_por_periodo(versoes, tenant):
+    # p50/p90 do tempo de conversão e contagens distintas por mês, a partir dos sketches
+    sketches_leads = utils.load_sketches_leads(versoes['leads'], tenant=tenant)
+    return sketches_leads.resumo(por='Periodo') if sketches_leads is not None else None
+
+# Nome na rota -> (datasets de origem, função que monta o DataFrame)
+DATASETS_API = {
+    'kpis': (('kpis',), _kpis),
+    'midia': (('midia',), _midia),
+    'performance': (('performance',), _performance),
+    'perda': (('perda',), _perda),
+    'ranking_vendedores': (('performance',), _ranking_vendedores),
+    'perdas_por_motivo': (('perda',), _perdas_por_motivo),
+    'alertas': (tuple(utils.ARQUIVOS_DADOS), _alertas),
+    'previsoes': (('receita_mensal', 'kpis', 'performance'), _previsoes),
+    'leads_por_periodo': (('leads',), _leads_por_periodo),
+}
+
+FORMATOS = {
+    'json': 'application/json; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+# --- Respostas (no cache de dados, por tenant e versão dos dados) ---
+def _serializar(df, formato):
+    # Índice com nome (ex.: 'Metrica', 'Motivo') vira coluna. CSV em UTF-8 sem BOM, direto pelo
+    # pandas: utils.convert_df_to_csv é o do botão de download do Streamlit (st.cache_data)
+    incluir_indice = df.index.name is not None
+    if formato == 'csv':
+        return df.to_csv(index=incluir_indice).encode('utf-8')
+    df_saida = df.reset_index() if incluir_indice else df
+    return df_saida.to_json(orient='records', force_ascii=False).encode('utf-8')
+
+@utils.cache_dados.memoizar(copiar=False)
+def _resposta(nome, formato, versoes_origem, tenant=None):
+    # (corpo, etag) ou None se o dataset não puder ser carregado. 'versoes_origem' compõe a
+    # chave do cache: versões antigas saem pelo LRU, como as dos loaders
+    _, montar = DATASETS_API[nome]
+    df = montar(dict(versoes_origem), tenant)
+    if df is None:
+        return None
+    corpo = _serializar(df, formato)
+    return corpo, '"' + hashlib.sha1(corpo).hexdigest()[:20] + '"'
+
+def obter_resposta(nome, formato, tenant=utils.TENANT_PADRAO):
+    # Retorna (corpo, etag) ou None se o dataset não puder ser carregado
+    origens, _ = DATASETS_API[nome]
+    versoes_origem = tuple((origem, utils.versao_dataset(origem, tenant)) for origem in origens)
+    return _resposta(nome, formato, versoes_origem, tenant=tenant)
+
+def _etag_confere(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidatos = [tag.strip() for tag in if_none_match.split(',')]
+    # Comparação fraca (RFC 9110): ignora o prefixo W/
+    return '*' in candidatos or etag in [tag[2:] if tag.startswith('W/') else tag for tag in candidatos]
+
+
+# --- Servidor HTTP ---
+class ManipuladorAPI(BaseHTTPRequestHandler):
+    server_version = 'BRBankAPI/1.0'
+
+    def do_GET(self):
+        self._responder(incluir_corpo=True)
+
+    def do_HEAD(self):
+        self._responder(incluir_corpo=False)
+
+    def _responder(self, incluir_corpo):
+        url = urlsplit(self.path)
+        partes = [p for p in url.path.split('/') if p]
+        if not partes or partes[0] != 'api' or len(partes) > 2:
+            return self._erro(404, 'Rota não encontrada. Use /api para listar os datasets.', incluir_corpo)
+
+        parametros = parse_qs(url.query)
+        tenant = parametros.get('tenant', [utils.TENANT_PADRAO])[0]
+        if tenant not in utils.listar_tenants():
+            return self._erro(404, f"Tenant desconhecido: '{tenant}'.", incluir_corpo)
+
+        if len(partes) == 1:
+            indice = {
+                nome: {'origens': {origem: utils.versao_dataset(origem, tenant) for origem in origens}}
+                for nome, (origens, _) in DATASETS_API.items()
+            }
+            corpo = json.dumps(indice, ensure_ascii=False).encode('utf-8')
+            return self._enviar(200, corpo, FORMATOS['json'], None, incluir_corpo)
+
+        # Rotas de operação: sempre calculadas na hora, sem ETag
+        if partes[1] == 'tenants':
+            corpo = json.dumps(utils.listar_tenants(), ensure_ascii=False).encode('utf-8')
+            return self._enviar(200, corpo, FORMATOS['json'], None, incluir_corpo)
+        if partes[1] == 'cache':
+            corpo = utils.estatisticas_cache().to_json(orient='records', force_ascii=False).encode('utf-8')
+            return self._enviar(200, corpo, FORMATOS['json'], None, incluir_corpo)
+
+        nome, _, extensao = partes[1].partition('.')
+        formato = extensao or parametros.get('formato', ['json'])[0]
+        if nome not in DATASETS_API:
+            return self._erro(404, f"Dataset desconhecido: '{nome}'.", incluir_corpo)
+        if formato not in FORMATOS:
+            return self._erro(400, f"Formato não suportado: '{formato}'. Use json ou csv.", incluir_corpo)
+
+        try:
+            resposta = obter_resposta(nome, formato, tenant)
+        except Exception as e:
+            return self._erro(500, f"Erro ao processar '{nome}': {e}", incluir_corpo)
+        if resposta is None:
+            return self._erro(503, f"Dataset '{nome}' indisponível (arquivo ausente ou inválido).", incluir_corpo)
+
+        corpo, etag = resposta
+        if _etag_confere(self.headers.get('If-None-Match'), etag):
+            return self._enviar(304, b'', None, etag, incluir_corpo=False)
+        self._enviar(200, corpo, FORMATOS[formato], etag, incluir_corpo)
+
+    def _enviar(self, status, corpo, content_type, etag, incluir_corpo):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(corpo)))
+        if etag:
+            self.send_header('ETag', etag)
+        # Clientes podem guardar a resposta, mas devem revalidar (If-None-Match) a cada uso
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if incluir_corpo and corpo:
+            self.wfile.write(corpo)
+
+    def _erro(self, status, mensagem, incluir_corpo):
+        corpo = json.dumps({'erro': mensagem}, ensure_ascii=False).encode('utf-8')
+        self._enviar(status, corpo, FORMATOS['json'], None, incluir_corpo)
+
+
+class ServidorPoolThreads(HTTPServer):
+    # Atende as conexões em um pool fixo de threads (em vez de uma thread nova por conexão)
+    def __init__(self, endereco, manipulador, max_threads=8):
+        super().__init__(endereco, manipulador)
+        self._pool = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='api')
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._processar, request, client_address)
+
+    def _processar(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API somente leitura com as métricas do dashboard BR Bank.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8502)
+    parser.add_argument('--threads', type=int, default=8, help="Tamanho do pool de threads.")
+    args = parser.parse_args()
+
+    servidor = ServidorPoolThreads((args.host, args.porta), ManipuladorAPI, max_threads=args.threads)
+    print(f"API do dashboard em http://{args.host}:{args.porta}/api")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
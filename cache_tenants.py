@@ -0,0 +1,174 @@
+"""
+Cache em memória com isolamento por tenant e orçamento de memória.
+
+Substitui o st.cache_data (sem limite de tamanho) nos loaders e cálculos do dashboard
+quando uma mesma instalação atende vários tenants (unidades de negócio / bancos):
+
+    - cada entrada pertence a um tenant; chaves de tenants diferentes nunca colidem;
+    - cada tenant tem um orçamento próprio e há um orçamento global, ambos em bytes;
+    - estourado o orçamento do tenant, saem as entradas menos usadas dele; estourado o
+      global, saem primeiro as entradas do tenant usado há mais tempo (tenant "frio");
+    - uma entrada maior que o orçamento do tenant (ex.: os sketches de leads de um tenant
+      grande) não é descartada: fica sozinha no espaço do tenant, removendo as demais, e
+      só sai por pressão do orçamento global; entradas maiores que o orçamento global são
+      recusadas, com aviso no log;
+    - contadores de acertos, faltas, remoções e recusas ficam disponíveis em estatisticas().
+
+Os valores são calculados fora do lock: duas threads podem calcular a mesma entrada ao
+mesmo tempo, mas nenhuma bloqueia as demais durante a leitura dos CSVs.
+"""
+import functools
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def estimar_tamanho(valor):
+    # Tamanho aproximado em bytes de um valor guardado no cache
+    if valor is None:
+        return 0
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if isinstance(valor, tuple):
+        return sum(estimar_tamanho(v) for v in valor)
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(valor, pd.DataFrame) else uso)
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if hasattr(valor, 'tamanho_bytes'):
+        return int(valor.tamanho_bytes())
+    if hasattr(valor, 'to_plotly_json'):  # figuras Plotly
+        return len(valor.to_json())
+    try:
+        return len(pickle.dumps(valor))
+    except Exception:
+        return 0
+
+
+def _congelar(valor):
+    # Converte argumentos (dicts, listas) em algo utilizável como chave de dicionário
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple, set)):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+
+_EVENTOS = ['acertos', 'faltas', 'remocoes', 'recusas']
+
+
+class CacheTenants:
+    def __init__(self, orcamento_global_bytes, orcamento_tenant_bytes, tenant_padrao=None):
+        self.orcamento_global = orcamento_global_bytes
+        self.orcamento_tenant = orcamento_tenant_bytes
+        self.tenant_padrao = tenant_padrao  # usado quando a chamada não informa o tenant
+        self._lock = threading.RLock()
+        self._tenants = OrderedDict()  # tenant -> OrderedDict(chave -> (valor, tamanho)); ordem = uso
+        self._bytes = {}
+        self._contadores = {}
+
+    # --- Operações básicas ---
+    def _contar(self, tenant, evento, quantidade=1):
+        contadores = self._contadores.setdefault(tenant, dict.fromkeys(_EVENTOS, 0))
+        contadores[evento] += quantidade
+
+    def obter(self, tenant, chave):
+        # Retorna (encontrado, valor) e marca tenant e entrada como recém-usados
+        with self._lock:
+            entradas = self._tenants.get(tenant)
+            if entradas is None or chave not in entradas:
+                self._contar(tenant, 'faltas')
+                return False, None
+            entradas.move_to_end(chave)
+            self._tenants.move_to_end(tenant)
+            self._contar(tenant, 'acertos')
+            return True, entradas[chave][0]
+
+    def guardar(self, tenant, chave, valor):
+        tamanho = estimar_tamanho(valor)
+        if tamanho > self.orcamento_global:
+            with self._lock:
+                self._contar(tenant, 'recusas')
+            logger.warning("Cache: entrada de %d bytes do tenant '%s' excede o orçamento global (%d bytes) "
+                           "e não foi guardada; será recalculada a cada uso.", tamanho, tenant, self.orcamento_global)
+            return
+        if tamanho > self.orcamento_tenant:
+            logger.warning("Cache: entrada de %d bytes excede o orçamento do tenant '%s' (%d bytes); "
+                           "as demais entradas do tenant serão removidas.", tamanho, tenant, self.orcamento_tenant)
+        with self._lock:
+            entradas = self._tenants.setdefault(tenant, OrderedDict())
+            if chave in entradas:
+                self._bytes[tenant] -= entradas.pop(chave)[1]
+            entradas[chave] = (valor, tamanho)
+            self._bytes[tenant] = self._bytes.get(tenant, 0) + tamanho
+            self._tenants.move_to_end(tenant)
+            self._aplicar_orcamentos(tenant)
+
+    def _remover_mais_antiga(self, tenant):
+        entradas = self._tenants[tenant]
+        _, (_, tamanho) = entradas.popitem(last=False)
+        self._bytes[tenant] -= tamanho
+        self._contar(tenant, 'remocoes')
+        if not entradas:
+            del self._tenants[tenant]
+            self._bytes[tenant] = 0
+
+    def _aplicar_orcamentos(self, tenant):
+        # A entrada recém-guardada (a mais nova) nunca sai pelo orçamento do próprio tenant
+        while tenant in self._tenants and self._bytes[tenant] > self.orcamento_tenant and len(self._tenants[tenant]) > 1:
+            self._remover_mais_antiga(tenant)
+        while sum(self._bytes.values()) > self.orcamento_global and self._tenants:
+            # Tenant usado há mais tempo primeiro; o tenant atual só perde entradas por último
+            frio = next(iter(self._tenants))
+            self._remover_mais_antiga(frio)
+
+    def limpar(self, tenant=None):
+        with self._lock:
+            tenants = [tenant] if tenant is not None else list(self._tenants)
+            for t in tenants:
+                self._tenants.pop(t, None)
+                self._bytes[t] = 0
+
+    # --- Decorador ---
+    def memoizar(self, copiar=True):
+        # Decora uma função para guardar o resultado por (tenant, argumentos). A função
+        # decorada recebe o tenant pelo argumento nomeado 'tenant'. Com copiar=True,
+        # DataFrames são devolvidos como cópia (como o st.cache_data), para que quem
+        # chama possa alterá-los sem afetar o cache.
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def envoltorio(*args, tenant=None, **kwargs):
+                tenant = tenant or self.tenant_padrao
+                chave = (funcao.__qualname__, _congelar(args), _congelar(kwargs))
+                encontrado, valor = self.obter(tenant, chave)
+                if not encontrado:
+                    valor = funcao(*args, tenant=tenant, **kwargs)
+                    self.guardar(tenant, chave, valor)
+                if copiar and isinstance(valor, (pd.DataFrame, pd.Series)):
+                    return valor.copy()
+                return valor
+            return envoltorio
+        return decorador
+
+    # --- Métricas ---
+    def estatisticas(self):
+        # Uma linha por tenant (mais o total): entradas, bytes, acertos, faltas, remoções e
+        # recusas (entradas maiores que o orçamento global, recalculadas a cada uso)
+        with self._lock:
+            tenants = sorted(set(self._contadores) | set(self._tenants), key=str)
+            linhas = [{
+                'Tenant': t,
+                'Entradas': len(self._tenants.get(t, ())),
+                'Bytes': self._bytes.get(t, 0),
+                **self._contadores.get(t, dict.fromkeys(_EVENTOS, 0)),
+            } for t in tenants]
+        df = pd.DataFrame(linhas, columns=['Tenant', 'Entradas', 'Bytes', *_EVENTOS])
+        df = df.rename(columns={'acertos': 'Acertos', 'faltas': 'Faltas', 'remocoes': 'Remoções', 'recusas': 'Recusas'})
+        total = df.drop(columns='Tenant').sum().to_dict()
+        return pd.concat([df, pd.DataFrame([{'Tenant': 'Total', **total}])], ignore_index=True)
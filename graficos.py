@@ -0,0 +1,132 @@
+"""
+Preparação dos dados dos gráficos para manter o payload do Plotly limitado.
+
+Com centenas de vendedores/motivos ou séries diárias, enviar todos os pontos para
+`px.bar`/`px.pie`/`px.line` faz o JSON da figura e a renderização no navegador
+crescerem sem limite. Aqui ficam os passos aplicados antes de montar cada figura:
+
+    agrupar_top_n        -> mantém as N maiores categorias e junta o resto em "Outros"
+                            (taxas e médias combinadas de forma ponderada)
+    lttb                 -> reduz uma série temporal a N pontos preservando a forma
+    criar_grafico_linhas -> aplica os dois acima e usa WebGL acima de um nº de pontos
+
+Os limites abaixo são os padrões; todas as funções aceitam outros valores.
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+LIMITE_CATEGORIAS = 15       # categorias (barras/grupos) por gráfico
+LIMITE_FATIAS_PIZZA = 8      # fatias por gráfico de pizza
+LIMITE_SERIES = 10           # linhas por gráfico de série temporal
+LIMITE_PONTOS_SERIE = 500    # pontos por linha após o downsampling
+LIMITE_PONTOS_WEBGL = 1000   # acima deste total de pontos, usa traces WebGL
+ROTULO_OUTROS = 'Outros'
+
+
+def agrupar_top_n(df, categoria, valor, n=LIMITE_CATEGORIAS, agregacao='sum', por=None, rotulo_outros=ROTULO_OUTROS,
+                  ordenar_por=None):
+    # Mantém as n categorias com maior total de 'ordenar_por' (padrão: o próprio 'valor') e
+    # agrega as demais em 'Outros' (dentro de cada grupo 'por', se informado). 'agregacao'
+    # define como o resto é combinado: 'sum' para volumes (receita, perdas), ou uma função que
+    # recebe as linhas agrupadas e retorna o valor (ver razao_ponderada e media_ponderada) para
+    # taxas e tempos. Uma categoria já chamada 'Outros' nos dados é sempre incorporada ao grupo 'Outros'.
+    if df[categoria].nunique() <= n:
+        return df
+    ranking = df[df[categoria] != rotulo_outros].groupby(categoria)[ordenar_por or valor].sum().nlargest(n).index
+    manter = df[categoria].isin(ranking)
+    chaves = [por] if por is not None else []
+    resto = df[~manter]
+    if callable(agregacao):
+        if chaves:
+            outros = resto.groupby(chaves).apply(agregacao).rename(valor).reset_index()
+        else:
+            outros = pd.DataFrame({valor: [agregacao(resto)]})
+    elif chaves:
+        outros = resto.groupby(chaves, as_index=False)[valor].agg(agregacao)
+    else:
+        outros = pd.DataFrame({valor: [resto[valor].agg(agregacao)]})
+    outros[categoria] = rotulo_outros
+    resultado = pd.concat([df[manter], outros], ignore_index=True)
+    # Registra quais colunas tiveram categorias agrupadas (usado por ordem_categorias)
+    resultado.attrs['categorias_agrupadas'] = set(df.attrs.get('categorias_agrupadas', ())) | {categoria}
+    return resultado
+
+
+def razao_ponderada(numerador, denominador, escala=1):
+    # Agregação de taxas: soma do numerador / soma do denominador (ex.: convertidos / recebidos * 100)
+    def agregar(df):
+        total = df[denominador].sum()
+        return df[numerador].sum() / total * escala if total > 0 else np.nan
+    return agregar
+
+
+def media_ponderada(valor, peso):
+    # Agregação de médias por grupo (ex.: tempo médio de conversão ponderado pelas conversões)
+    def agregar(df):
+        validos = df[valor].notna() & df[peso].notna()
+        total = df.loc[validos, peso].sum()
+        return (df.loc[validos, valor] * df.loc[validos, peso]).sum() / total if total > 0 else np.nan
+    return agregar
+
+
+def ordem_categorias(df, categoria, valor, rotulo_outros=ROTULO_OUTROS):
+    # Ordem decrescente por valor total. 'Outros' vai para o fim só quando foi criado por
+    # agrupar_top_n; uma categoria 'Outros' original dos dados fica na posição do seu total.
+    ordem = df.groupby(categoria)[valor].sum().sort_values(ascending=False).index.tolist()
+    if categoria not in df.attrs.get('categorias_agrupadas', ()):
+        return ordem
+    return [c for c in ordem if c != rotulo_outros] + ([rotulo_outros] if rotulo_outros in ordem else [])
+
+
+def lttb(x, y, n_pontos=LIMITE_PONTOS_SERIE):
+    # Largest-Triangle-Three-Buckets: retorna os índices dos n_pontos que melhor
+    # preservam a forma visual da série (primeiro e último pontos sempre mantidos).
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    total = len(x)
+    if n_pontos >= total or n_pontos < 3:
+        return np.arange(total)
+
+    limites = np.linspace(1, total - 1, n_pontos - 1).astype(int)  # n_pontos - 2 buckets internos
+    indices = np.empty(n_pontos, dtype=int)
+    indices[0], indices[-1] = 0, total - 1
+    anterior = 0
+    for b in range(n_pontos - 2):
+        inicio, fim = limites[b], limites[b + 1]
+        # Média do próximo bucket (ou o último ponto, no bucket final)
+        prox_inicio, prox_fim = fim, (limites[b + 2] if b + 2 < len(limites) else total)
+        media_x = x[prox_inicio:prox_fim].mean()
+        media_y = y[prox_inicio:prox_fim].mean()
+        # Área do triângulo (anterior, candidato, média do próximo) para todos os candidatos
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[b + 1] = anterior
+    return indices
+
+
+def reduzir_series(df, x, y, cor=None, n_pontos=LIMITE_PONTOS_SERIE):
+    # Aplica LTTB em cada série (uma por valor de 'cor') ordenada por x
+    grupos = [df] if cor is None else [g for _, g in df.groupby(cor, sort=False)]
+    reduzidos = []
+    for grupo in grupos:
+        grupo = grupo.sort_values(x)
+        eixo_x = grupo[x]
+        if not pd.api.types.is_numeric_dtype(eixo_x):
+            eixo_x = pd.to_datetime(eixo_x).astype('int64')
+        reduzidos.append(grupo.iloc[lttb(eixo_x, grupo[y].to_numpy(dtype=float), n_pontos)])
+    return pd.concat(reduzidos, ignore_index=True) if reduzidos else df
+
+
+def criar_grafico_linhas(df, x, y, cor=None, n_series=LIMITE_SERIES, n_pontos=LIMITE_PONTOS_SERIE,
+                         limite_webgl=LIMITE_PONTOS_WEBGL, **kwargs_px):
+    # px.line com payload limitado: top-N séries (+ "Outros"), LTTB por série e WebGL
+    # quando o total de pontos enviados ainda passar do limite.
+    if cor is not None:
+        df = agrupar_top_n(df, cor, y, n=n_series, por=x)
+    df = reduzir_series(df, x, y, cor, n_pontos)
+    render_mode = 'webgl' if len(df) > limite_webgl else 'svg'
+    return px.line(df, x=x, y=y, color=cor, render_mode=render_mode, **kwargs_px)
@@ -1,12 +1,10 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
-from utils import format_currency, format_percentage, load_kpis, load_midia # Importa funções
+from utils import format_currency, format_percentage, load_kpis, load_midia, figura_funil, FUNIL_KPIS, calcular_alertas, exibir_alertas, versoes_datasets, load_sketches_leads, metricas_leads_aquisicao, seletor_tenant # Importa funções
 
 # Define paleta de cores Azul Pastel
 azul_pastel_palette = ['#E1F5FE', '#B3E5FC', '#81D4FA', '#4FC3F7', '#29B6F6'] # Do mais claro ao mais escuro
-funnel_colors = azul_pastel_palette[::-1] # Inverte para funil (mais escuro no topo)
 channel_color_map = {'GoogleAds': azul_pastel_palette[3], 'MetaAds': azul_pastel_palette[1]} # Tons diferentes de azul
 
 # Inicializa estados da sessão se não existirem
@@ -16,8 +14,10 @@ if 'exec_mode' not in st.session_state:
     st.session_state['exec_mode'] = False
 
 # --- Carregar Dados ---
-df_kpis = load_kpis()
-df_midia = load_midia()
+tenant = seletor_tenant()
+versoes = versoes_datasets(tenant) # Chave do cache: dados novos assim que um CSV muda
+df_kpis = load_kpis(versoes['kpis'], tenant=tenant)
+df_midia = load_midia(versoes['midia'], tenant=tenant)
 
 # --- Conteúdo da Página ---
 st.title("🎯 Aquisição (Top of Funnel)")
@@ -41,30 +41,18 @@ st.session_state['channel_filter'] = selected_channel
 
 # --- Lógica Principal ---
 if df_kpis is not None and df_midia is not None:
+    exibir_alertas(calcular_alertas(versoes, tenant=tenant), 'Aquisição')
+
     col_acq1, col_acq2 = st.columns([2,3])
 
     # --- Coluna 1: Funil Geral e Taxas ---
     with col_acq1:
         st.subheader("Funil de Aquisição Geral")
         try:
-            required_kpis_funnel = ['Impressões dos Anúncios', 'Visitantes no site', 'Cliques no Anúncio', 'Leads Cadastrados no CRM', 'Leads Convertidos']
+            required_kpis_funnel = FUNIL_KPIS
             if all(kpi in df_kpis.index for kpi in required_kpis_funnel):
-                funnel_data = {
-                    'Etapa': ['Impressões', 'Visitantes', 'Cliques', 'Leads CRM', 'Clientes (Vendas)'],
-                    'Valor': [ df_kpis.loc[kpi, 'Valor'] for kpi in required_kpis_funnel ]
-                }
-                df_funnel = pd.DataFrame(funnel_data).dropna(subset=['Valor'])
-                df_funnel = df_funnel[df_funnel['Valor'] > 0]
-                df_funnel['Valor'] = df_funnel['Valor'].astype(int)
-
-                if not df_funnel.empty:
-                    # Atualiza cores do funil
-                    fig_funnel = go.Figure(go.Funnel(
-                        y = df_funnel['Etapa'], x = df_funnel['Valor'],
-                        textposition = "inside", textinfo = "value+percent previous",
-                        opacity = 0.8, marker = {"color": funnel_colors[0:len(df_funnel)]}, # Usa paleta azul pastel
-                        connector = {"line": {"color": "silver", "dash": "dot", "width": 2}}))
-                    fig_funnel.update_layout(title_text="Visualização do Funil", margin=dict(t=50, l=0, r=0, b=0), height=400)
+                fig_funnel = figura_funil(versoes['kpis'], tenant=tenant)
+                if fig_funnel is not None:
                     st.plotly_chart(fig_funnel, use_container_width=True)
                 else:
                     st.warning("Não há dados válidos para exibir o funil.")
@@ -101,6 +89,12 @@ if df_kpis is not None and df_midia is not None:
             kpi_col5.metric("CPA (Custo por Lead Ads)", format_currency(df_midia.loc['CPA (R$)', display_col_kpi]))
             kpi_col6.metric("CTR (%)", format_percentage(df_midia.loc['CTR (%)', display_col_kpi]))
 
+            # Contagens distintas por canal (somente com leads.csv): somáveis entre canais sem dupla contagem
+            metricas_leads = metricas_leads_aquisicao(load_sketches_leads(versoes['leads'], tenant=tenant), st.session_state['channel_filter'])
+            if metricas_leads:
+                for kpi_col, (rotulo, valor, ajuda) in zip(st.columns(len(metricas_leads)), metricas_leads):
+                    kpi_col.metric(rotulo, valor, help=ajuda)
+
             # --- Gráficos (Ocultáveis no modo executivo) ---
             if not st.session_state.get('exec_mode', False):
                 st.markdown("---")
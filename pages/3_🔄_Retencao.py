@@ -3,11 +3,14 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from utils import format_currency, format_percentage, load_kpis, load_perda, convert_df_to_csv
+from utils import (format_currency, format_percentage, load_kpis, load_perda, convert_df_to_csv,
+                   calcular_alertas, exibir_alertas, versoes_datasets, load_sketches_leads, seletor_tenant,
+                   calcular_perdas_por_motivo, metricas_leads_retencao, potencial_receita_leads_ativos)
+from graficos import agrupar_top_n, ordem_categorias, LIMITE_FATIAS_PIZZA, LIMITE_SERIES
 
 # Define paleta de cores Azul Pastel para 5 vendedores + outros (se necessário)
 azul_pastel_palette = ['#E1F5FE', '#B3E5FC', '#81D4FA', '#4FC3F7', '#29B6F6'] # Do mais claro ao mais escuro
-seller_color_map = {'A': azul_pastel_palette[0], 'B': azul_pastel_palette[1], 'C': azul_pastel_palette[2], 'D': azul_pastel_palette[3], 'E': azul_pastel_palette[4]}
+seller_color_map = {'A': azul_pastel_palette[0], 'B': azul_pastel_palette[1], 'C': azul_pastel_palette[2], 'D': azul_pastel_palette[3], 'E': azul_pastel_palette[4], 'Outros': '#CFD8DC'}
 pie_color_sequence = px.colors.sequential.Blues_r # Usa paleta sequencial azul do Plotly para a pizza
 
 # Inicializa o estado da sessão se não existir
@@ -15,8 +18,10 @@ if 'exec_mode' not in st.session_state:
     st.session_state['exec_mode'] = False
 
 # --- Carregar Dados ---
-df_kpis = load_kpis()
-df_perda = load_perda()
+tenant = seletor_tenant()
+versoes = versoes_datasets(tenant) # Chave do cache: dados novos assim que um CSV muda
+df_kpis = load_kpis(versoes['kpis'], tenant=tenant)
+df_perda = load_perda(versoes['perda'], tenant=tenant)
 
 # --- Conteúdo da Página ---
 st.title("🔄 Retenção (Middle of Funnel)")
@@ -39,18 +44,20 @@ if df_kpis is not None and df_perda is not None:
 
         # Cálculo e Exibição do Potencial de Receita Leads Ativos
         try:
-            leads_ativos = df_kpis.loc['Leads Ativos para Follow-up', 'Valor']
-            tx_conv_hist_pct = df_kpis.loc['Taxa de Conversão Leads → Clientes (%)', 'Valor']
-            ticket_medio = df_kpis.loc['Ticket Médio (R$)', 'Valor']
-
-            if pd.notna(leads_ativos) and pd.notna(tx_conv_hist_pct) and pd.notna(ticket_medio):
-                potencial_receita = leads_ativos * (tx_conv_hist_pct / 100.0) * ticket_medio
+            potencial_receita = potencial_receita_leads_ativos(df_kpis)
+            if potencial_receita is not None:
                 col7.metric("Potencial Receita Leads Ativos", format_currency(potencial_receita), help="Estimativa: Leads Ativos * Tx. Conv. Histórica (L→C) * Ticket Médio.")
             else:
                  col7.metric("Potencial Receita Leads Ativos", "N/A", help="Não foi possível calcular. Verifique os KPIs de origem.")
         except Exception as e_potencial:
             col7.metric("Potencial Receita Leads Ativos", "Erro", help=f"Erro no cálculo: {e_potencial}")
 
+        # Distribuição do tempo de conversão e leads únicos (disponível apenas com leads.csv)
+        metricas_leads = metricas_leads_retencao(load_sketches_leads(versoes['leads'], tenant=tenant))
+        if metricas_leads:
+            for col, (rotulo, valor, ajuda) in zip(st.columns(len(metricas_leads)), metricas_leads):
+                col.metric(rotulo, valor, help=ajuda)
+
     except KeyError as e:
         st.warning(f"Métrica não encontrada para Indicadores de Retenção: {e}. Verifique kpis_gerais.csv.")
     except Exception as e:
@@ -59,19 +66,11 @@ if df_kpis is not None and df_perda is not None:
     st.markdown("---")
     st.header("🚫 Motivos de Perda")
 
-    # Alerta Visual Motivo Principal
+    # Alertas Visuais (regras configuradas em regras_alerta.csv)
     try:
-        motivo_principal = "Não retornou contato"
-        limiar_alerta = 0.7
-        if motivo_principal in df_perda.index and 'Total' in df_perda.columns and pd.notna(df_perda.loc[motivo_principal, 'Total']):
-            total_perdas = df_perda['Total'].sum()
-            perdas_motivo_principal = df_perda.loc[motivo_principal, 'Total']
-            if pd.notna(total_perdas) and total_perdas > 0:
-                percentual_motivo_principal = (perdas_motivo_principal / total_perdas)
-                if percentual_motivo_principal > limiar_alerta:
-                    st.warning(f"⚠️ Atenção: '{motivo_principal}' representa {percentual_motivo_principal:.1%} das perdas totais. Otimizar follow-up é crucial!")
+        exibir_alertas(calcular_alertas(versoes, tenant=tenant), 'Retenção')
     except Exception as e_alerta:
-         st.error(f"Não foi possível gerar alerta de motivo de perda: {e_alerta}")
+         st.error(f"Não foi possível gerar alertas de motivo de perda: {e_alerta}")
 
     # Análise de Motivos de Perda (Ocultável no modo executivo)
     if not st.session_state.get('exec_mode', False):
@@ -80,9 +79,9 @@ if df_kpis is not None and df_perda is not None:
         with col_perda1:
             st.subheader("Volume Total por Motivo")
             try:
-                df_perda_total = df_perda[['Total']].sort_values(by='Total', ascending=False).dropna()
+                df_perda_total = calcular_perdas_por_motivo(df_perda) # Mesmo cálculo da API (/api/perdas_por_motivo)
                 if not df_perda_total.empty:
-                    st.dataframe(df_perda_total.astype(int)) # Mostra como inteiro
+                    st.dataframe(df_perda_total.astype({'Total': int})) # Mostra o total como inteiro
                     df_perda_total_download = df_perda_total.reset_index()
                     csv_perda_total = convert_df_to_csv(df_perda_total_download)
                     st.download_button(
@@ -90,8 +89,8 @@ if df_kpis is not None and df_perda is not None:
                        file_name='motivos_perda_total.csv', mime='text/csv', key='download-perda-total'
                     )
 
-                    # Gráfico de Pizza (Cores Atualizadas)
-                    fig_perda_pie = px.pie(df_perda_total_download, names='Motivo', values='Total',
+                    # Gráfico de Pizza (Cores Atualizadas; motivos além do top-N viram "Outros")
+                    fig_perda_pie = px.pie(agrupar_top_n(df_perda_total_download, 'Motivo', 'Total', n=LIMITE_FATIAS_PIZZA), names='Motivo', values='Total',
                                           title='Distribuição Geral dos Motivos de Perda', hole=0.3,
                                           color_discrete_sequence=pie_color_sequence) # Aplica paleta sequencial azul
                     fig_perda_pie.update_traces(textinfo='percent+label', textfont_size=14, marker=dict(line=dict(color='#000000', width=1)))
@@ -107,9 +106,12 @@ if df_kpis is not None and df_perda is not None:
                 df_perda_comp = df_perda.drop(columns=['Total'], errors='ignore').reset_index()
                 df_perda_melted = df_perda_comp.melt(id_vars='Motivo', var_name='Vendedor', value_name='Quantidade').dropna(subset=['Quantidade'])
                 df_perda_melted['Quantidade'] = df_perda_melted['Quantidade'].astype(int)
+                # Limita motivos x vendedores enviados ao gráfico: top-N de cada dimensão + "Outros"
+                df_perda_melted = agrupar_top_n(df_perda_melted, 'Motivo', 'Quantidade', por='Vendedor')
+                df_perda_melted = agrupar_top_n(df_perda_melted, 'Vendedor', 'Quantidade', n=LIMITE_SERIES, por='Motivo')
 
                 if not df_perda_melted.empty:
-                     category_order = df_perda_total.index.tolist() if 'df_perda_total' in locals() and not df_perda_total.empty else None
+                     category_order = ordem_categorias(df_perda_melted, 'Motivo', 'Quantidade')
                      # Gráfico de Barras (Cores Atualizadas)
                      fig_perda_vendedor = px.bar(df_perda_melted, x='Motivo', y='Quantidade', color='Vendedor',
                                                  barmode='group', title='Motivos de Perda Detalhados por Vendedor',
@@ -3,20 +3,27 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 # Importa funções do utils.py (necessário ter utils.py na raiz do projeto)
-from utils import format_currency, format_percentage, load_kpis, load_performance, convert_df_to_csv
+from utils import (format_currency, format_percentage, load_kpis, load_performance, convert_df_to_csv,
+                   calcular_alertas, exibir_alertas, versoes_datasets, calcular_previsoes,
+                   calcular_ritmo_vendedores, META_FATURAMENTO_ANUAL, load_sketches_leads,
+                   load_receita_mensal, seletor_tenant, tabela_ranking_vendedores, destaques_vendedores,
+                   tabela_ritmo_vendedores)
+from graficos import agrupar_top_n, criar_grafico_linhas, razao_ponderada, media_ponderada
 
 # --- Paleta de Cores Azul Pastel para Vendedores ---
 # (Certifique-se que os nomes A, B, C, D, E correspondem aos seus dados)
 azul_pastel_palette = ['#E1F5FE', '#B3E5FC', '#81D4FA', '#4FC3F7', '#29B6F6'] # Do mais claro ao mais escuro
-seller_color_map = {'A': azul_pastel_palette[0], 'B': azul_pastel_palette[1], 'C': azul_pastel_palette[2], 'D': azul_pastel_palette[3], 'E': azul_pastel_palette[4]}
+seller_color_map = {'A': azul_pastel_palette[0], 'B': azul_pastel_palette[1], 'C': azul_pastel_palette[2], 'D': azul_pastel_palette[3], 'E': azul_pastel_palette[4], 'Outros': '#CFD8DC'}
 
 # --- Inicialização do Estado da Sessão (Modo Executivo) ---
 if 'exec_mode' not in st.session_state:
     st.session_state['exec_mode'] = False
 
 # --- Carregar Dados Essenciais ---
-df_kpis = load_kpis()
-df_performance = load_performance()
+tenant = seletor_tenant()
+versoes = versoes_datasets(tenant) # Chave do cache: dados novos assim que um CSV muda
+df_kpis = load_kpis(versoes['kpis'], tenant=tenant)
+df_performance = load_performance(versoes['performance'], tenant=tenant)
 
 # --- Conteúdo da Página ---
 st.title("💰 Monetização (Bottom of Funnel)")
@@ -41,6 +48,7 @@ if df_kpis is not None and df_performance is not None:
 
     st.markdown("---")
     st.header("🏆 Performance da Equipe de Vendas")
+    exibir_alertas(calcular_alertas(versoes, tenant=tenant), 'Monetização')
 
     try:
         # Cria cópia para não alterar o dataframe cacheado
@@ -62,6 +70,14 @@ if df_kpis is not None and df_performance is not None:
             st.warning("Colunas 'Receita Total (R$)' ou 'Tempo Conversão (dias)' não encontradas para calcular Receita por Dia.")
             receita_dia_col = None # Flag para não formatar/usar depois
 
+        # --- Tempo de Conversão p50/p90 por Vendedor (somente com leads.csv) ---
+        cols_tempo_quantis = []
+        sketches_leads = load_sketches_leads(versoes['leads'], tenant=tenant)
+        if sketches_leads is not None:
+            df_tempo_quantis = sketches_leads.resumo(por='Vendedor')[['Tempo Conversão p50 (dias)', 'Tempo Conversão p90 (dias)']]
+            df_performance_processed = df_performance_processed.merge(df_tempo_quantis, left_on='Vendedor', right_index=True, how='left')
+            cols_tempo_quantis = list(df_tempo_quantis.columns)
+
         # --- Tabela de Performance (Ocultável no modo executivo) ---
         if not st.session_state.get('exec_mode', False):
             st.subheader("Tabela Detalhada de Performance")
@@ -78,6 +94,8 @@ if df_kpis is not None and df_performance is not None:
             if 'Tempo Conversão (dias)' in df_display.columns:
                 # Formata apenas se for número, senão mantém como está (pode ser NA)
                 df_display['Tempo Conversão (dias)'] = df_display['Tempo Conversão (dias)'].apply(lambda x: f"{x:.0f} dias" if pd.notna(x) else 'N/A')
+            for col in cols_tempo_quantis:
+                df_display[col] = df_display[col].apply(lambda x: f"{x:.1f} dias" if pd.notna(x) else 'N/A')
 
             st.dataframe(df_display, use_container_width=True)
 
@@ -98,13 +116,13 @@ if df_kpis is not None and df_performance is not None:
         # --- Gráficos de Performance (Ocultáveis no modo executivo) ---
         if not st.session_state.get('exec_mode', False):
             st.subheader("Análise Gráfica Individual")
-            # Garante que temos dados para plotar
+            # Garante que temos dados para plotar (com muitos vendedores, os gráficos mostram o top-N + "Outros")
             if not df_performance_processed.empty:
                 col_vend1, col_vend2 = st.columns(2)
                 with col_vend1:
                     # Gráfico de Receita (Cores Atualizadas)
                     if 'Receita Total (R$)' in df_performance_processed.columns:
-                        fig_rev_vendedor = px.bar(df_performance_processed, x='Vendedor', y='Receita Total (R$)', color='Vendedor', title='Receita Total Gerada', text_auto='.2s', labels={'Receita Total (R$)':'Receita (R$)'},
+                        fig_rev_vendedor = px.bar(agrupar_top_n(df_performance_processed, 'Vendedor', 'Receita Total (R$)'), x='Vendedor', y='Receita Total (R$)', color='Vendedor', title='Receita Total Gerada', text_auto='.2s', labels={'Receita Total (R$)':'Receita (R$)'},
                                                   color_discrete_map=seller_color_map) # << COR AZUL PASTEL APLICADA
                         fig_rev_vendedor.update_traces(textposition='outside')
                         fig_rev_vendedor.update_layout(showlegend=False, height=350)
@@ -112,17 +130,24 @@ if df_kpis is not None and df_performance is not None:
 
                     # Gráfico Leads Convertidos (Cores Atualizadas)
                     if 'Leads Convertidos' in df_performance_processed.columns:
-                        fig_leads_conv_vendedor = px.bar(df_performance_processed, x='Vendedor', y='Leads Convertidos', color='Vendedor', title='Leads Convertidos', text_auto=True,
+                        fig_leads_conv_vendedor = px.bar(agrupar_top_n(df_performance_processed, 'Vendedor', 'Leads Convertidos'), x='Vendedor', y='Leads Convertidos', color='Vendedor', title='Leads Convertidos', text_auto=True,
                                                          color_discrete_map=seller_color_map) # << COR AZUL PASTEL APLICADA
                         fig_leads_conv_vendedor.update_traces(textposition='outside')
                         fig_leads_conv_vendedor.update_layout(showlegend=False, height=350)
                         st.plotly_chart(fig_leads_conv_vendedor, use_container_width=True)
 
+                # Taxas e tempos: top-N por volume de leads (não pelo valor plotado) e "Outros"
+                # ponderado pelos leads, em vez da média simples das taxas dos vendedores agrupados
+                colunas_volume = {'Leads Recebidos', 'Leads Convertidos'}.issubset(df_performance_processed.columns)
+                ordenar_taxas = 'Leads Recebidos' if colunas_volume else None
+                agregacao_taxa = razao_ponderada('Leads Convertidos', 'Leads Recebidos', escala=100) if colunas_volume else 'mean'
+                agregacao_tempo = media_ponderada('Tempo Conversão (dias)', 'Leads Convertidos') if colunas_volume else 'mean'
                 with col_vend2:
                      # Gráfico Taxa Conversão (Cores Atualizadas)
                      if 'Taxa Conversão (%)' in df_performance_processed.columns:
-                        y_range_max = df_performance_processed['Taxa Conversão (%)'].max() * 1.15 if pd.notna(df_performance_processed['Taxa Conversão (%)'].max()) else None
-                        fig_tx_vendedor = px.bar(df_performance_processed, x='Vendedor', y='Taxa Conversão (%)', color='Vendedor', title='Taxa de Conversão', text_auto='.1f', range_y=[0, y_range_max],
+                        df_tx_vendedor = agrupar_top_n(df_performance_processed, 'Vendedor', 'Taxa Conversão (%)', agregacao=agregacao_taxa, ordenar_por=ordenar_taxas)
+                        y_range_max = df_tx_vendedor['Taxa Conversão (%)'].max() * 1.15 if pd.notna(df_tx_vendedor['Taxa Conversão (%)'].max()) else None
+                        fig_tx_vendedor = px.bar(df_tx_vendedor, x='Vendedor', y='Taxa Conversão (%)', color='Vendedor', title='Taxa de Conversão', text_auto='.1f', range_y=[0, y_range_max],
                                                  color_discrete_map=seller_color_map) # << COR AZUL PASTEL APLICADA
                         fig_tx_vendedor.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
                         fig_tx_vendedor.update_layout(showlegend=False, height=350)
@@ -130,11 +155,21 @@ if df_kpis is not None and df_performance is not None:
 
                      # Gráfico Tempo Médio Conversão (Cores Atualizadas)
                      if 'Tempo Conversão (dias)' in df_performance_processed.columns:
-                        fig_tempo_vendedor = px.bar(df_performance_processed, x='Vendedor', y='Tempo Conversão (dias)', color='Vendedor', title='Tempo Médio de Conversão', text_auto='.0f',
+                        fig_tempo_vendedor = px.bar(agrupar_top_n(df_performance_processed, 'Vendedor', 'Tempo Conversão (dias)', agregacao=agregacao_tempo, ordenar_por=ordenar_taxas), x='Vendedor', y='Tempo Conversão (dias)', color='Vendedor', title='Tempo Médio de Conversão', text_auto='.0f',
                                                     color_discrete_map=seller_color_map) # << COR AZUL PASTEL APLICADA
                         fig_tempo_vendedor.update_traces(texttemplate='%{text:.0f}d', textposition='outside')
                         fig_tempo_vendedor.update_layout(showlegend=False, height=350)
                         st.plotly_chart(fig_tempo_vendedor, use_container_width=True)
+
+                # Receita mensal por vendedor (somente com receita_mensal.csv): top-N séries,
+                # downsampling LTTB e WebGL mantêm o gráfico leve com muitos vendedores/meses
+                df_receita_mensal = load_receita_mensal(versoes['receita_mensal'], tenant=tenant)
+                if df_receita_mensal is not None and 'Vendedor' in df_receita_mensal.columns:
+                    df_mensal_vendedor = df_receita_mensal.groupby(['Mes', 'Vendedor'], as_index=False)['Receita (R$)'].sum()
+                    fig_mensal_vendedor = criar_grafico_linhas(df_mensal_vendedor, x='Mes', y='Receita (R$)', cor='Vendedor', title='Receita Mensal por Vendedor',
+                                                               color_discrete_map=seller_color_map)
+                    fig_mensal_vendedor.update_layout(height=400)
+                    st.plotly_chart(fig_mensal_vendedor, use_container_width=True)
             else:
                  st.warning("Não há dados de performance para exibir os gráficos.")
         # else: # Comentado para evitar mensagem desnecessária
@@ -144,47 +179,39 @@ if df_kpis is not None and df_performance is not None:
         # --- Ranking de Performance (Melhorado Visualmente) ---
         st.subheader("📊 Ranking de Performance da Equipe")
 
-        # Função auxiliar para obter dados do ranking com segurança
-        def get_rank_data(df, col, id_func, format_func=None):
-             # Verifica se a coluna existe e não está toda NaN
-             if col not in df.columns or df[col].isnull().all(): return "N/A", "N/A"
-             # Aplica idxmin/idxmax nos não-NaN e obtém o índice original
-             valid_series = df[col].dropna()
-             if valid_series.empty: return "N/A", "N/A"
-             idx = id_func(valid_series)
-             # Se idx for retornado e existir no DataFrame original...
-             if pd.notna(idx) and idx in df.index:
-                 val = df.loc[idx, col]
-                 vend = df.loc[idx, 'Vendedor']
-                 text = format_func(val) if format_func and pd.notna(val) else (str(int(val)) if pd.notna(val) else "N/A") # Formata ou converte pra string
-                 return vend, text
-             return "N/A", "N/A"
-
-
-        # Obtem dados para o ranking (com tratamento de erro mais robusto)
-        best_tx_vend, best_tx_val = get_rank_data(df_performance_processed, 'Taxa Conversão (%)', pd.Series.idxmax, format_percentage)
-        worst_tx_vend, worst_tx_val = get_rank_data(df_performance_processed, 'Taxa Conversão (%)', pd.Series.idxmin, format_percentage)
-        best_rec_vend, best_rec_val = get_rank_data(df_performance_processed, 'Receita Total (R$)', pd.Series.idxmax, format_currency)
-        worst_rec_vend, worst_rec_val = get_rank_data(df_performance_processed, 'Receita Total (R$)', pd.Series.idxmin, format_currency)
-        best_tk_vend, best_tk_val = get_rank_data(df_performance_processed, 'Ticket Médio (R$)', pd.Series.idxmax, format_currency)
-        worst_tk_vend, worst_tk_val = get_rank_data(df_performance_processed, 'Ticket Médio (R$)', pd.Series.idxmin, format_currency)
-        best_tm_vend, best_tm_val = get_rank_data(df_performance_processed, 'Tempo Conversão (dias)', pd.Series.idxmin, lambda x: f"{x:.0f} dias")
-        worst_tm_vend, worst_tm_val = get_rank_data(df_performance_processed, 'Tempo Conversão (dias)', pd.Series.idxmax, lambda x: f"{x:.0f} dias")
-
-        # Exibição melhorada com colunas e expander
+        # Posição por receita e participação de cada vendedor (mesma tabela do relatório estático)
+        if 'Receita Total (R$)' in df_performance_processed.columns:
+            st.dataframe(tabela_ranking_vendedores(df_performance_processed), hide_index=True, use_container_width=True)
+
+        # Melhor e pior vendedor em cada indicador, com colunas e expander
+        melhores, piores = destaques_vendedores(df_performance_processed)
         ranking_col1, ranking_col2 = st.columns(2)
-        with ranking_col1:
-            with st.expander("🏆 Melhores Performances", expanded=True):
-                st.markdown(f"**Taxa Conversão:** {best_tx_vend} ({best_tx_val})")
-                st.markdown(f"**Receita Total:** {best_rec_vend} ({best_rec_val})")
-                st.markdown(f"**Ticket Médio:** {best_tk_vend} ({best_tk_val})")
-                st.markdown(f"**Tempo Médio Conv. (Mais Rápido):** {best_tm_vend} ({best_tm_val})")
-        with ranking_col2:
-             with st.expander("⚠️ Pontos de Atenção", expanded=True):
-                st.markdown(f"**Taxa Conversão:** {worst_tx_vend} ({worst_tx_val})")
-                st.markdown(f"**Receita Total:** {worst_rec_vend} ({worst_rec_val})")
-                st.markdown(f"**Ticket Médio:** {worst_tk_vend} ({worst_tk_val})")
-                st.markdown(f"**Tempo Médio Conv. (Mais Lento):** {worst_tm_vend} ({worst_tm_val})")
+        for ranking_col, titulo, destaques in [(ranking_col1, "🏆 Melhores Performances", melhores),
+                                               (ranking_col2, "⚠️ Pontos de Atenção", piores)]:
+            with ranking_col:
+                with st.expander(titulo, expanded=True):
+                    for rotulo, vendedor, valor in destaques:
+                        st.markdown(f"**{rotulo}:** {vendedor} ({valor})")
+
+        st.markdown("---")
+        # --- Ritmo vs Meta por Vendedor (Projeção Anual) ---
+        st.subheader("🎯 Ritmo vs Meta por Vendedor")
+        df_previsoes = calcular_previsoes(versoes, tenant=tenant)
+        df_ritmo = calcular_ritmo_vendedores(df_previsoes)
+        if not df_ritmo.empty:
+            base_previsao = df_previsoes['Base'].iloc[0]
+            st.caption(f"Projeção anual de cada vendedor (base: {base_previsao.lower()}) comparada à meta anual de {format_currency(META_FATURAMENTO_ANUAL)} dividida igualmente entre a equipe.")
+            st.dataframe(tabela_ritmo_vendedores(df_previsoes).set_index('Vendedor'), use_container_width=True)
+
+            if not st.session_state.get('exec_mode', False):
+                fig_ritmo = px.bar(agrupar_top_n(df_ritmo, 'Vendedor', 'Ritmo vs Meta (%)', agregacao=razao_ponderada('Projeção Anual', 'Meta Anual', escala=100)), x='Vendedor', y='Ritmo vs Meta (%)', color='Vendedor', title='Ritmo vs Meta (Projeção Anual / Meta)', text_auto='.1f',
+                                   color_discrete_map=seller_color_map)
+                fig_ritmo.add_hline(y=100, line_dash='dot', line_color='orange', annotation_text='Meta')
+                fig_ritmo.update_traces(texttemplate='%{y:.1f}%', textposition='outside')
+                fig_ritmo.update_layout(showlegend=False, height=350)
+                st.plotly_chart(fig_ritmo, use_container_width=True)
+        else:
+            st.info("Não há projeções por vendedor disponíveis.")
 
     except Exception as e:
         st.error(f"Ocorreu um erro ao exibir performance dos vendedores: {e}")
@@ -0,0 +1,116 @@
+"""
+Previsão de receita em lote para várias séries mensais ao mesmo tempo.
+
+Cada linha da matriz de entrada é uma série (empresa, um vendedor, um canal) e cada
+coluna um mês. O ajuste de tendência linear (mínimos quadrados) e da sazonalidade
+aditiva é feito com operações NumPy sobre a matriz inteira, sem laço por série, então
+milhares de séries são processadas em milissegundos.
+
+Meses ausentes podem vir como NaN: são ignorados no ajuste. As colunas devem cobrir
+meses consecutivos (um mês sem nenhum dado é uma coluna toda NaN, não uma coluna a menos).
+"""
+import numpy as np
+import pandas as pd
+
+PERIODO_SAZONAL = 12  # meses
+
+
+def ajustar_tendencia(matriz):
+    # Retorna (intercepto, inclinação) por série; séries com menos de 2 meses ficam planas
+    valores = np.asarray(matriz, dtype=float)
+    t = np.arange(valores.shape[1], dtype=float)
+    presente = ~np.isnan(valores)
+    y = np.where(presente, valores, 0.0)
+
+    n = presente.sum(axis=1)
+    soma_t = presente @ t
+    soma_tt = presente @ (t * t)
+    soma_y = y.sum(axis=1)
+    soma_ty = y @ t
+
+    denominador = n * soma_tt - soma_t ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inclinacao = np.where(denominador > 0, (n * soma_ty - soma_t * soma_y) / denominador, 0.0)
+        intercepto = np.where(n > 0, (soma_y - inclinacao * soma_t) / n, np.nan)
+    return intercepto, inclinacao
+
+
+def ajustar_sazonalidade(matriz, intercepto, inclinacao, periodo=PERIODO_SAZONAL):
+    # Índices sazonais aditivos (média dos resíduos por posição no ciclo, centrados em zero).
+    # Só são estimados com pelo menos 2 ciclos completos; caso contrário ficam zerados.
+    valores = np.asarray(matriz, dtype=float)
+    n_series, n_meses = valores.shape
+    if n_meses < 2 * periodo:
+        return np.zeros((n_series, periodo))
+
+    t = np.arange(n_meses)
+    residuos = valores - (intercepto[:, None] + inclinacao[:, None] * t)
+    presente = ~np.isnan(residuos)
+    posicao = np.zeros((n_meses, periodo))
+    posicao[t, t % periodo] = 1.0  # matriz (mês x posição no ciclo)
+
+    somas = np.where(presente, residuos, 0.0) @ posicao
+    contagens = presente.astype(float) @ posicao
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sazonal = np.where(contagens > 0, somas / contagens, 0.0)
+    return sazonal - sazonal.mean(axis=1, keepdims=True)
+
+
+def ajustar_modelo(matriz, periodo=PERIODO_SAZONAL):
+    # Tendência + sazonalidade de todas as séries: (intercepto, inclinação, índices sazonais)
+    valores = np.asarray(matriz, dtype=float)
+    n_meses = valores.shape[1]
+    intercepto, inclinacao = ajustar_tendencia(valores)
+    sazonal = ajustar_sazonalidade(valores, intercepto, inclinacao, periodo)
+    if n_meses >= 2 * periodo:
+        # Reajusta a tendência sem a sazonalidade (ciclos incompletos enviesam a inclinação)
+        dessazonalizado = valores - sazonal[:, np.arange(n_meses) % periodo]
+        intercepto, inclinacao = ajustar_tendencia(dessazonalizado)
+        sazonal = ajustar_sazonalidade(valores, intercepto, inclinacao, periodo)
+    return intercepto, inclinacao, sazonal
+
+
+def prever_series(matriz, horizonte, periodo=PERIODO_SAZONAL):
+    # Retorna (ajuste dos meses observados, previsão dos próximos 'horizonte' meses), ambos (séries x meses)
+    valores = np.asarray(matriz, dtype=float)
+    n_meses = valores.shape[1]
+    intercepto, inclinacao, sazonal = ajustar_modelo(valores, periodo)
+    t = np.arange(n_meses + horizonte)
+    modelo = intercepto[:, None] + inclinacao[:, None] * t + sazonal[:, t % periodo]
+    return modelo[:, :n_meses], modelo[:, n_meses:]
+
+
+def projetar_ano(matriz, mes_final=None, meses_ano=12, periodo=PERIODO_SAZONAL):
+    # Receita projetada para o ano civil da última coluna de cada série: meses já realizados
+    # no ano (meses ausentes, inclusive os anteriores ao início da série, preenchidos pelo
+    # modelo) + previsão dos meses que faltam até dezembro.
+    # mes_final: mês do calendário (1-12) da última coluna; sem ele, o ano começa na 1ª coluna.
+    valores = np.asarray(matriz, dtype=float)
+    n_meses = valores.shape[1]
+    if mes_final is None:
+        mes_final = (n_meses - 1) % meses_ano + 1
+    inicio_ano = n_meses - mes_final  # negativo se a série começa depois de janeiro
+    restantes = meses_ano - mes_final
+
+    intercepto, inclinacao, sazonal = ajustar_modelo(valores, periodo)
+    t = np.arange(inicio_ano, n_meses + restantes)
+    modelo = intercepto[:, None] + inclinacao[:, None] * t + sazonal[:, t % periodo]
+    observado = np.full(modelo.shape, np.nan)
+    inicio_observado = max(inicio_ano, 0)
+    observado[:, inicio_observado - inicio_ano:n_meses - inicio_ano] = valores[:, inicio_observado:]
+    return np.where(np.isnan(observado), modelo, observado).sum(axis=1)
+
+
+def projetar_receitas(df_series, meses_ano=12):
+    # df_series: índice = (Tipo, Serie), colunas = meses consecutivos em ordem cronológica
+    # (PeriodIndex mensal para projetar o ano civil), valores = receita.
+    # Retorna um DataFrame com realizado, tendência mensal e projeção anual por série.
+    valores = df_series.to_numpy(dtype=float)
+    mes_final = df_series.columns[-1].month if isinstance(df_series.columns, pd.PeriodIndex) else None
+    _, inclinacao, _ = ajustar_modelo(valores)
+    return pd.DataFrame({
+        'Realizado': np.nansum(valores, axis=1),
+        'Tendência Mensal': inclinacao,
+        'Projeção Anual': projetar_ano(valores, mes_final, meses_ano),
+        'Meses': (~np.isnan(valores)).sum(axis=1),
+    }, index=df_series.index).reset_index()
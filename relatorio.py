@@ -0,0 +1,304 @@
+"""
+Gera o relatório executivo estático (HTML) do dashboard.
+
+Renderiza a visão do "Modo Executivo Simplificado" das quatro páginas (Resumo Executivo,
+Aquisição, Retenção e Monetização) em um arquivo HTML por filtro de canal, para que
+muitos leitores possam abrir o relatório sem iniciar uma sessão do Streamlit. Alertas,
+métricas de leads.csv e tabelas de vendedores vêm dos mesmos helpers de utils usados
+pelas páginas.
+
+Os arquivos só são regenerados quando algum CSV usado pelo relatório muda: as versões
+usadas em cada geração ficam registradas em <saida>/manifesto.json. O plotly.js fica em
+um único plotly.min.js ao lado dos HTMLs (copie o diretório inteiro ao publicar).
+
+Uso:
+    python relatorio.py --saida relatorios
+    python relatorio.py --saida relatorios --forcar   # regenera mesmo sem mudanças
+    python relatorio.py --tenant banco_sul            # dados de dados/banco_sul, saída em relatorios/banco_sul
+
+Para PDF, abra o HTML no navegador e use "Imprimir -> Salvar como PDF".
+"""
+import argparse
+import html
+import json
+import os
+
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+import utils
+
+CANAIS = ['Todos', 'GoogleAds', 'MetaAds']
+ARQUIVO_MANIFESTO = 'manifesto.json'
+ARQUIVO_PLOTLYJS = 'plotly.min.js'
+# Datasets lidos pelo relatório (perda e regras pelos alertas, leads pelos sketches): só eles disparam regeneração
+DATASETS_RELATORIO = ['kpis', 'midia', 'performance', 'perda', 'regras', 'receita_mensal', 'leads']
+
+CSS = """
+body { font-family: 'Source Sans Pro', Arial, sans-serif; margin: 2rem auto; max-width: 1100px; color: #262730; }
+h1 { margin-bottom: 0.2rem; } h2 { border-top: 1px solid #ddd; padding-top: 1.2rem; margin-top: 2rem; }
+.metricas { display: grid; grid-template-columns: repeat(4, 1fr); gap: 1rem; margin: 1rem 0; }
+.metrica { background: #F5FBFF; border: 1px solid #B3E5FC; border-radius: 6px; padding: 0.8rem; }
+.metrica .rotulo { font-size: 0.85rem; color: #555; } .metrica .valor { font-size: 1.5rem; font-weight: 600; }
+.aviso { background: #FFF8E1; border-left: 4px solid #FFB300; padding: 0.6rem 1rem; margin: 0.8rem 0; }
+.info { background: #E1F5FE; border-left: 4px solid #29B6F6; padding: 0.6rem 1rem; margin: 0.8rem 0; }
+.legenda { color: #666; font-size: 0.85rem; }
+table { border-collapse: collapse; } th, td { padding: 0.3rem 0.8rem; border-bottom: 1px solid #ddd; text-align: right; }
+"""
+
+
+# --- Blocos HTML ---
+def _metricas(itens):
+    # Itens (rótulo, valor) ou (rótulo, valor, ajuda), como os dos helpers de utils; a ajuda é ignorada
+    cards = ''.join(
+        f'<div class="metrica"><div class="rotulo">{html.escape(rotulo)}</div>'
+        f'<div class="valor">{html.escape(valor)}</div></div>'
+        for rotulo, valor, *_ in itens
+    )
+    return f'<div class="metricas">{cards}</div>'
+
+def _caixa(classe, texto):
+    return f'<div class="{classe}">{html.escape(texto)}</div>'
+
+class _Figuras:
+    # Referencia o plotly.min.js compartilhado (ARQUIVO_PLOTLYJS) apenas na primeira figura
+    def __init__(self):
+        self._js_incluido = False
+
+    def html(self, fig):
+        incluir_js = 'directory' if not self._js_incluido else False
+        trecho = fig.to_html(full_html=False, include_plotlyjs=incluir_js, config={'displayModeBar': False})
+        self._js_incluido = True
+        return trecho
+
+def _alertas(df_alertas, pagina):
+    # Mesma correspondência de severidade usada por utils.exibir_alertas
+    classes = {'info': 'info', 'nota': 'legenda'}
+    alertas_pagina = df_alertas[df_alertas['Pagina'] == pagina]
+    return [_caixa(classes.get(sev, 'aviso'), msg) for sev, msg in zip(alertas_pagina['Severidade'], alertas_pagina['Mensagem'])]
+
+def _valor(df, metrica, coluna='Valor'):
+    return df.loc[metrica, coluna] if metrica in df.index else None
+
+def _inteiro(valor):
+    return f"{int(valor):,}" if pd.notna(valor) else "N/A"
+
+
+# --- Seções (equivalentes ao Modo Executivo de cada página) ---
+def secao_resumo(df_kpis, df_previsoes, df_alertas, figuras):
+    partes = ['<h2>🏠 Resumo Executivo</h2>']
+    receita_total_valor = _valor(df_kpis, 'Receita Total (R$)')
+    ltv_valor = _valor(df_kpis, 'LTV (R$)')
+    cac_valor = _valor(df_kpis, 'CPA - Custo por Aquisição (R$)')
+
+    projecao_anual = None
+    gap_meta = None
+    if pd.notna(receita_total_valor):
+        gap_meta = utils.META_FATURAMENTO_ANUAL - receita_total_valor
+        projecao_anual = utils.projecao_anual_empresa(df_previsoes, receita_total_valor)
+
+    partes.append('<h3>📈 Crescimento e Metas</h3>')
+    partes.append(_metricas([
+        ("Receita Total (Período)", utils.format_currency(receita_total_valor)),
+        ("Gap para Meta Anual", utils.format_currency(gap_meta) if gap_meta is not None else "N/A"),
+        ("Projeção Anual (Tendência)", utils.format_currency(projecao_anual) if projecao_anual is not None else "N/A"),
+        ("Leads Convertidos", _inteiro(_valor(df_kpis, 'Leads Convertidos'))),
+    ]))
+    if pd.notna(receita_total_valor):
+        partes.append('<h4>Progresso da Receita vs Meta Anual</h4>')
+        partes.append(figuras.html(utils.criar_grafico_velocimetro(receita_total_valor, projecao_anual)))
+
+    partes.append('<h3>💰 Lucratividade e Eficiência</h3>')
+    partes.append(_metricas([
+        ("Lucro Líquido (Período)", utils.format_currency(_valor(df_kpis, 'Lucro Líquido (R$)'))),
+        ("Margem Líquida (%)", utils.format_percentage(_valor(df_kpis, 'Margem Líquida (%)'))),
+        ("ROAS (%)", utils.format_percentage(_valor(df_kpis, 'ROAS (%)'))),
+        ("CAC (proxy Custo Ads)", utils.format_currency(cac_valor)),
+    ]))
+
+    ltv_cac_ratio = ltv_valor / cac_valor if pd.notna(ltv_valor) and pd.notna(cac_valor) and cac_valor > 0 else None
+    partes.append(_metricas([
+        ("LTV (proxy)", utils.format_currency(ltv_valor)),
+        ("CAC (proxy Custo Ads)", utils.format_currency(cac_valor)),
+        ("LTV / CAC Ratio", f"{ltv_cac_ratio:.1f}x" if ltv_cac_ratio is not None else "N/A"),
+    ]))
+    if ltv_cac_ratio is not None:
+        partes += _alertas(df_alertas, 'Resumo Executivo')
+        if not utils.alerta_ltv_cac_disparado(df_alertas):
+            partes.append(_caixa('legenda', f"✅ A relação LTV/CAC de {ltv_cac_ratio:.1f}x indica uma aquisição saudável."))
+    return ''.join(partes)
+
+def secao_aquisicao(df_kpis, df_midia, canal, df_alertas, figuras, sketches_leads=None):
+    partes = ['<h2>🎯 Aquisição</h2>', *_alertas(df_alertas, 'Aquisição')]
+    if all(kpi in df_kpis.index for kpi in utils.FUNIL_KPIS):
+        fig_funnel = utils.criar_grafico_funil(df_kpis)
+        if fig_funnel is not None:
+            partes.append(figuras.html(fig_funnel))
+        partes.append(_metricas([
+            ("Tx. Conv. Visitantes → Leads (%)", utils.format_percentage(_valor(df_kpis, 'Taxa de Conversão Visitantes → Leads (%)'))),
+            ("Tx. Conv. Leads → Clientes (%)", utils.format_percentage(_valor(df_kpis, 'Taxa de Conversão Leads → Clientes (%)'))),
+        ]))
+
+    coluna = 'Total' if canal == 'Todos' else canal
+    partes.append(f'<h3>Performance por Canal ({html.escape(canal)})</h3>')
+    if df_midia is not None and coluna in df_midia.columns:
+        partes.append(_metricas([
+            ("Impressões", _inteiro(_valor(df_midia, 'Impressões', coluna))),
+            ("Cliques", _inteiro(_valor(df_midia, 'Cliques', coluna))),
+            ("Custo Total", utils.format_currency(_valor(df_midia, 'Custo de Tráfego Pago (R$)', coluna))),
+            ("Leads Captados (Ads)", _inteiro(_valor(df_midia, 'Leads Captados', coluna))),
+            ("CPA (Custo por Lead Ads)", utils.format_currency(_valor(df_midia, 'CPA (R$)', coluna))),
+            ("CTR (%)", utils.format_percentage(_valor(df_midia, 'CTR (%)', coluna))),
+        ]))
+        metricas_leads = utils.metricas_leads_aquisicao(sketches_leads, canal)
+        if metricas_leads:
+            partes.append(_metricas(metricas_leads))
+    else:
+        partes.append(_caixa('aviso', "Dados de mídia indisponíveis para este canal."))
+    partes.append(_caixa('info', "Detalhes comparativos ocultos no Modo Executivo."))
+    return ''.join(partes)
+
+def secao_retencao(df_kpis, df_alertas, sketches_leads=None):
+    partes = ['<h2>🔄 Retenção</h2>']
+    tempo_medio = _valor(df_kpis, 'Tempo Médio para Conversão (dias)')
+    potencial_receita = utils.potencial_receita_leads_ativos(df_kpis)
+
+    partes.append(_metricas([
+        ("Leads Cadastrados (CRM)", _inteiro(_valor(df_kpis, 'Leads Cadastrados no CRM'))),
+        ("Leads Convertidos", _inteiro(_valor(df_kpis, 'Leads Convertidos'))),
+        ("Leads Perdidos", _inteiro(_valor(df_kpis, 'Leads Perdidos'))),
+        ("Tx. Conv. Leads → Clientes", utils.format_percentage(_valor(df_kpis, 'Taxa de Conversão Leads → Clientes (%)'))),
+        ("Tempo Médio Conversão", f"{int(tempo_medio)} dias" if pd.notna(tempo_medio) else "N/A"),
+        ("Leads Ativos (Follow-up)", _inteiro(_valor(df_kpis, 'Leads Ativos para Follow-up'))),
+        ("Potencial Receita Leads Ativos", utils.format_currency(potencial_receita) if potencial_receita is not None else "N/A"),
+    ]))
+    metricas_leads = utils.metricas_leads_retencao(sketches_leads)
+    if metricas_leads:
+        partes.append(_metricas(metricas_leads))
+
+    partes += _alertas(df_alertas, 'Retenção')
+    partes.append(_caixa('info', "Análise detalhada de motivos de perda oculta no Modo Executivo."))
+    return ''.join(partes)
+
+def secao_monetizacao(df_kpis, df_performance, df_previsoes, df_alertas):
+    partes = ['<h2>💰 Monetização</h2>']
+    partes.append(_metricas([
+        ("Receita Total", utils.format_currency(_valor(df_kpis, 'Receita Total (R$)'))),
+        ("Lucro Líquido", utils.format_currency(_valor(df_kpis, 'Lucro Líquido (R$)'))),
+        ("Ticket Médio por Cliente", utils.format_currency(_valor(df_kpis, 'Ticket Médio (R$)'))),
+        ("LTV (proxy)", utils.format_currency(_valor(df_kpis, 'LTV (R$)'))),
+    ]))
+    if df_performance is None or df_performance.empty:
+        partes.append(_caixa('aviso', "Não há dados de performance dos vendedores."))
+        return ''.join(partes)
+
+    partes += _alertas(df_alertas, 'Monetização')
+    if 'Receita Total (R$)' in df_performance.columns and 'Tempo Conversão (dias)' in df_performance.columns:
+        tempo = df_performance['Tempo Conversão (dias)'].where(df_performance['Tempo Conversão (dias)'] > 0)
+        media_receita_dia = (df_performance['Receita Total (R$)'] / tempo).mean()
+        partes.append(_metricas([("Receita Média por Dia de Conversão (Geral)", utils.format_currency(media_receita_dia))]))
+
+    partes.append('<h3>📊 Ranking de Performance da Equipe</h3>')
+    if 'Receita Total (R$)' in df_performance.columns:
+        partes.append(utils.tabela_ranking_vendedores(df_performance).to_html(index=False, border=0))
+    melhores, piores = utils.destaques_vendedores(df_performance)
+    for titulo, destaques in [("🏆 Melhores Performances", melhores), ("⚠️ Pontos de Atenção", piores)]:
+        itens = ''.join(f"<li><b>{html.escape(rotulo)}:</b> {html.escape(str(vendedor))} ({html.escape(valor)})</li>"
+                        for rotulo, vendedor, valor in destaques)
+        partes.append(f"<h4>{titulo}</h4><ul>{itens}</ul>")
+
+    df_ritmo = utils.tabela_ritmo_vendedores(df_previsoes)
+    if not df_ritmo.empty:
+        partes.append('<h3>🎯 Ritmo vs Meta por Vendedor</h3>')
+        partes.append(df_ritmo.to_html(index=False, border=0))
+    return ''.join(partes)
+
+
+# --- Geração ---
+def renderizar_relatorio(canal, dados):
+    figuras = _Figuras()
+    df_kpis = dados['kpis']
+    corpo = [
+        '<h1>Relatório Executivo | BR Bank</h1>',
+        f'<p class="legenda">Período: Set/22 a Fev/23 · Canal: {html.escape(canal)} · '
+        f'Gerado em {pd.to_datetime("today", utc=True).strftime("%d/%m/%Y %H:%M")} UTC</p>',
+    ]
+    if df_kpis is None:
+        corpo.append(_caixa('aviso', "Arquivo kpis_gerais.csv não carregado. KPIs não podem ser exibidos."))
+    else:
+        df_alertas = dados['alertas']
+        corpo.append(secao_resumo(df_kpis, dados['previsoes'], df_alertas, figuras))
+        corpo.append(secao_aquisicao(df_kpis, dados['midia'], canal, df_alertas, figuras, dados['sketches_leads']))
+        corpo.append(secao_retencao(df_kpis, df_alertas, dados['sketches_leads']))
+        corpo.append(secao_monetizacao(df_kpis, dados['performance'], dados['previsoes'], df_alertas))
+    return (
+        '<!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8">'
+        f'<title>Relatório Executivo BR Bank - {html.escape(canal)}</title><style>{CSS}</style></head>'
+        f'<body>{"".join(corpo)}</body></html>'
+    )
+
+def gerar_relatorios(diretorio_saida, forcar=False, tenant=utils.TENANT_PADRAO):
+    # Gera um HTML por canal; retorna a lista de arquivos (re)gerados nesta execução
+    os.makedirs(diretorio_saida, exist_ok=True)
+    caminho_manifesto = os.path.join(diretorio_saida, ARQUIVO_MANIFESTO)
+    try:
+        with open(caminho_manifesto, encoding='utf-8') as f:
+            manifesto = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifesto = {}
+
+    versoes = {nome: utils.versao_dataset(nome, tenant) for nome in DATASETS_RELATORIO}
+    pendentes = [
+        canal for canal in CANAIS
+        if forcar
+        or manifesto.get(canal) != versoes
+        or not os.path.exists(os.path.join(diretorio_saida, f"relatorio_executivo_{canal}.html"))
+    ]
+    caminho_plotlyjs = os.path.join(diretorio_saida, ARQUIVO_PLOTLYJS)
+    if not os.path.exists(caminho_plotlyjs):
+        with open(caminho_plotlyjs, 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+    if not pendentes:
+        return []
+
+    dados = {
+        'kpis': utils.load_kpis(versoes['kpis'], tenant=tenant),
+        'midia': utils.load_midia(versoes['midia'], tenant=tenant),
+        'performance': utils.load_performance(versoes['performance'], tenant=tenant),
+        'sketches_leads': utils.load_sketches_leads(versoes['leads'], tenant=tenant),
+        'previsoes': utils.calcular_previsoes(versoes, tenant=tenant),
+        'alertas': utils.calcular_alertas(versoes, tenant=tenant),
+    }
+    gerados = []
+    for canal in pendentes:
+        arquivo = os.path.join(diretorio_saida, f"relatorio_executivo_{canal}.html")
+        with open(arquivo, 'w', encoding='utf-8') as f:
+            f.write(renderizar_relatorio(canal, dados))
+        manifesto[canal] = versoes
+        gerados.append(arquivo)
+
+    with open(caminho_manifesto, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    return gerados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o relatório executivo estático do dashboard BR Bank.")
+    parser.add_argument('--saida', default='relatorios', help="Diretório de saída dos arquivos HTML.")
+    parser.add_argument('--forcar', action='store_true', help="Regenera mesmo que os dados não tenham mudado.")
+    parser.add_argument('--tenant', default=utils.TENANT_PADRAO, choices=utils.listar_tenants(),
+                        help="Tenant (unidade de negócio) cujos dados serão usados.")
+    args = parser.parse_args()
+
+    # Cada tenant tem seu próprio diretório (e manifesto) dentro da saída
+    saida = args.saida if args.tenant == utils.TENANT_PADRAO else os.path.join(args.saida, args.tenant)
+    gerados = gerar_relatorios(saida, forcar=args.forcar, tenant=args.tenant)
+    if gerados:
+        for arquivo in gerados:
+            print(f"Gerado: {arquivo}")
+    else:
+        print("Dados sem alteração desde a última geração; nenhum relatório regenerado.")
+
+
+if __name__ == '__main__':
+    main()
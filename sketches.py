@@ -0,0 +1,211 @@
+"""
+Sketches mescláveis para distribuições e contagens distintas por partição.
+
+Durante a ingestão dos leads (leads.csv, lido em blocos) cada partição
+(período x canal x vendedor) recebe:
+    - um sketch de quantis do tempo até a conversão (buckets logarítmicos, estilo DDSketch,
+      erro relativo de ~1% em qualquer quantil);
+    - dois sketches de contagem distinta (HyperLogLog) para visitantes e leads (só os
+      visitantes presentes em leads.csv, isto é, que viraram lead).
+
+Qualquer filtro de período, canal ou vendedor é respondido mesclando os sketches das
+partições selecionadas (soma de contagens / máximo de registradores), sem reler os leads.
+Os sketches de todas as partições ficam em arrays NumPy esparsos (só células não nulas),
+então a memória acompanha o volume de leads e não o nº de partições, e mesclar milhares
+de partições continua sendo uma única redução.
+"""
+import numpy as np
+import pandas as pd
+
+# --- Quantis (buckets logarítmicos) ---
+ERRO_RELATIVO = 0.01
+GAMMA = (1 + ERRO_RELATIVO) / (1 - ERRO_RELATIVO)
+VALOR_MINIMO = 1e-3  # valores <= mínimo (ex.: conversão no mesmo dia) vão para o bucket 0
+VALOR_MAXIMO = 1e6
+N_BUCKETS = int(np.ceil(np.log(VALOR_MAXIMO / VALOR_MINIMO) / np.log(GAMMA))) + 1
+
+# --- Contagem distinta (HyperLogLog) ---
+PRECISAO_HLL = 12  # 2^12 registradores -> erro padrão ~1.6%
+N_REGISTRADORES = 1 << PRECISAO_HLL
+_BITS_RESTANTES = 64 - PRECISAO_HLL
+
+
+def _buckets(valores):
+    valores = np.asarray(valores, dtype=float)
+    indices = np.ceil(np.log(np.maximum(valores, VALOR_MINIMO) / VALOR_MINIMO) / np.log(GAMMA)).astype(np.int64)
+    indices = np.clip(indices, 0, N_BUCKETS - 1)
+    indices[valores <= VALOR_MINIMO] = 0
+    return indices
+
+def _valor_bucket(indices):
+    # Valor representativo do bucket (meio geométrico); bucket 0 representa zero
+    indices = np.asarray(indices)
+    return np.where(indices == 0, 0.0, VALOR_MINIMO * 2 * GAMMA ** indices / (GAMMA + 1))
+
+def _quantis(contagens, qs):
+    # contagens: (n, N_BUCKETS) -> (n, len(qs)); NaN onde não há observações
+    contagens = np.atleast_2d(contagens)
+    acumulado = np.cumsum(contagens, axis=1)
+    total = acumulado[:, -1:]
+    alvo = np.asarray(qs, dtype=float)[None, :] * np.maximum(total - 1, 0)
+    indices = (acumulado[:, None, :] <= alvo[:, :, None]).sum(axis=2)
+    return np.where(total > 0, _valor_bucket(indices), np.nan)
+
+
+def _bit_length(x):
+    # Número de bits significativos de cada uint64 (vetorizado)
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.uint8)
+    for deslocamento in (32, 16, 8, 4, 2, 1):
+        grande = x >= (np.uint64(1) << np.uint64(deslocamento))
+        n[grande] += deslocamento
+        x[grande] >>= np.uint64(deslocamento)
+    return n + (x > 0)
+
+def _hll(identificadores):
+    # Retorna (registrador, rho) de cada identificador
+    hashes = pd.util.hash_array(np.asarray(identificadores, dtype=object))
+    registrador = (hashes >> np.uint64(_BITS_RESTANTES)).astype(np.int64)
+    resto = hashes & np.uint64((1 << _BITS_RESTANTES) - 1)
+    rho = (_BITS_RESTANTES + 1 - _bit_length(resto)).astype(np.uint8)
+    return registrador, rho
+
+def _estimativa_hll(registradores):
+    # registradores: (n, N_REGISTRADORES) -> estimativa de distintos por linha
+    registradores = np.atleast_2d(registradores).astype(float)
+    m = N_REGISTRADORES
+    alfa = 0.7213 / (1 + 1.079 / m)
+    bruta = alfa * m * m / np.sum(2.0 ** -registradores, axis=1)
+    vazios = (registradores == 0).sum(axis=1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(vazios, 1))
+    # Correção para cardinalidades pequenas (contagem linear)
+    return np.where((bruta <= 2.5 * m) & (vazios > 0), linear, bruta)
+
+
+class _MatrizEsparsa:
+    # Matriz (partição x coluna) guardada só com as células não nulas (formato coordenado).
+    # 'combinar' é a redução das células repetidas: np.add (contagens) ou np.maximum (HLL).
+    def __init__(self, combinar, dtype_coluna, dtype_valor):
+        self.combinar = combinar
+        self.linhas = np.zeros(0, dtype=np.int32)
+        self.colunas = np.zeros(0, dtype=dtype_coluna)
+        self.valores = np.zeros(0, dtype=dtype_valor)
+        self._compactado = 0  # nº de células após a última compactação completa
+
+    @staticmethod
+    def _reduzir(combinar, linhas, colunas, valores, n_colunas):
+        # Junta células repetidas (mesma linha e coluna) aplicando 'combinar'
+        chave = linhas.astype(np.int64) * n_colunas + colunas
+        unicas, inverso = np.unique(chave, return_inverse=True)
+        reduzidos = np.zeros(len(unicas), dtype=valores.dtype)
+        combinar.at(reduzidos, inverso, valores)
+        return (unicas // n_colunas).astype(linhas.dtype), (unicas % n_colunas).astype(colunas.dtype), reduzidos
+
+    def adicionar(self, linhas, colunas, valores, n_colunas):
+        linhas, colunas, valores = self._reduzir(
+            self.combinar, linhas.astype(self.linhas.dtype), colunas.astype(self.colunas.dtype),
+            valores.astype(self.valores.dtype), n_colunas)
+        self.linhas = np.concatenate([self.linhas, linhas])
+        self.colunas = np.concatenate([self.colunas, colunas])
+        self.valores = np.concatenate([self.valores, valores])
+        # Compactação amortizada: no máximo ~2x o tamanho compactado entre duas compactações
+        if len(self.linhas) > 2 * max(self._compactado, 1 << 16):
+            self.linhas, self.colunas, self.valores = self._reduzir(
+                self.combinar, self.linhas, self.colunas, self.valores, n_colunas)
+            self._compactado = len(self.linhas)
+
+    def densa_por_grupo(self, grupo_da_particao, n_grupos, n_colunas):
+        # Reduz as partições selecionadas (grupo >= 0) em uma matriz densa (grupos x colunas)
+        grupos = grupo_da_particao[self.linhas]
+        sel = grupos >= 0
+        densa = np.zeros((n_grupos, n_colunas), dtype=self.valores.dtype)
+        self.combinar.at(densa, (grupos[sel], self.colunas[sel]), self.valores[sel])
+        return densa
+
+    @property
+    def nbytes(self):
+        return self.linhas.nbytes + self.colunas.nbytes + self.valores.nbytes
+
+
+class SketchesLeads:
+    # Sketches por partição (Periodo, Canal, Vendedor). Cada sketch é guardado de forma
+    # esparsa (só buckets e registradores não nulos), então uma partição com poucos leads
+    # ocupa poucos bytes, mesmo com dezenas de milhares de partições.
+    DIMENSOES = ['Periodo', 'Canal', 'Vendedor']
+    NAO_INFORMADO = 'Não informado'  # partição dos leads sem período, canal ou vendedor
+
+    def __init__(self):
+        self.particoes = pd.DataFrame(columns=self.DIMENSOES)
+        self._posicao = {}
+        self.tempo_conversao = _MatrizEsparsa(np.add, np.int16, np.int32)
+        self.visitantes = _MatrizEsparsa(np.maximum, np.int16, np.uint8)
+        self.leads = _MatrizEsparsa(np.maximum, np.int16, np.uint8)
+
+    def tamanho_bytes(self):
+        # Memória ocupada pelos sketches e pelo índice de partições (usado pelo cache por tenant)
+        return (self.tempo_conversao.nbytes + self.visitantes.nbytes + self.leads.nbytes
+                + int(self.particoes.memory_usage(deep=True).sum()))
+
+    def _indices_particao(self, chaves):
+        # Linha de cada registro nos sketches, criando partições novas quando necessário
+        tuplas = list(zip(*(chaves[d] for d in self.DIMENSOES)))
+        novas = [t for t in dict.fromkeys(tuplas) if t not in self._posicao]
+        if novas:
+            inicio = len(self._posicao)
+            self._posicao.update({t: inicio + i for i, t in enumerate(novas)})
+            self.particoes = pd.concat([self.particoes, pd.DataFrame(novas, columns=self.DIMENSOES)], ignore_index=True)
+        return np.fromiter((self._posicao[t] for t in tuplas), dtype=np.int64, count=len(tuplas))
+
+    def ingerir(self, df):
+        # df: Periodo, Canal, Vendedor, ID Lead, ID Visitante, Tempo Conversão (dias) (vazio se não converteu)
+        if df.empty:
+            return
+        # Dimensão vazia vira uma partição explícita (NaN não serve como chave nem como grupo)
+        df = df.assign(**{d: df[d].fillna(self.NAO_INFORMADO) for d in self.DIMENSOES})
+        linhas = self._indices_particao(df)
+
+        tempo = pd.to_numeric(df['Tempo Conversão (dias)'], errors='coerce').to_numpy(dtype=float)
+        convertidos = ~np.isnan(tempo)
+        self.tempo_conversao.adicionar(linhas[convertidos], _buckets(tempo[convertidos]),
+                                       np.ones(convertidos.sum(), dtype=np.int32), N_BUCKETS)
+
+        for coluna, sketch in (('ID Visitante', self.visitantes), ('ID Lead', self.leads)):
+            presentes = df[coluna].notna().to_numpy()
+            registrador, rho = _hll(df.loc[presentes, coluna].astype(str).to_numpy())
+            sketch.adicionar(linhas[presentes], registrador, rho, N_REGISTRADORES)
+
+    def _selecao(self, periodos=None, canais=None, vendedores=None):
+        mascara = np.ones(len(self.particoes), dtype=bool)
+        for dimensao, valores in zip(self.DIMENSOES, (periodos, canais, vendedores)):
+            if valores is not None:
+                valores = [valores] if isinstance(valores, str) else list(valores)
+                mascara &= self.particoes[dimensao].isin(valores).to_numpy()
+        return mascara
+
+    def resumo(self, por=None, periodos=None, canais=None, vendedores=None, qs=(0.5, 0.9)):
+        # Mescla as partições filtradas (opcionalmente agrupando por uma dimensão) e
+        # retorna quantis do tempo de conversão e contagens distintas estimadas.
+        mascara = self._selecao(periodos, canais, vendedores)
+        if por is None:
+            grupos = np.zeros(mascara.sum(), dtype=np.int64)
+            rotulos = pd.Index(['Todos'], name='Grupo')
+        else:
+            grupos, rotulos = pd.factorize(self.particoes.loc[mascara, por], sort=True, use_na_sentinel=False)
+            rotulos = pd.Index(rotulos, name=por).fillna(self.NAO_INFORMADO)
+        n_grupos = len(rotulos)
+        grupo_da_particao = np.full(len(self.particoes), -1, dtype=np.int64)
+        grupo_da_particao[mascara] = grupos
+
+        tempo = self.tempo_conversao.densa_por_grupo(grupo_da_particao, n_grupos, N_BUCKETS)
+        visitantes = self.visitantes.densa_por_grupo(grupo_da_particao, n_grupos, N_REGISTRADORES)
+        leads = self.leads.densa_por_grupo(grupo_da_particao, n_grupos, N_REGISTRADORES)
+
+        quantis = _quantis(tempo, qs)
+        df = pd.DataFrame({
+            **{f"Tempo Conversão p{int(q * 100)} (dias)": quantis[:, i] for i, q in enumerate(qs)},
+            'Conversões': tempo.sum(axis=1),
+            'Leads Únicos (estim.)': np.round(_estimativa_hll(leads)),
+            'Visitantes que Viraram Lead (estim.)': np.round(_estimativa_hll(visitantes)),
+        }, index=rotulos)
+        return df
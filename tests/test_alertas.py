@@ -0,0 +1,118 @@
+"""
+Compara o motor vetorizado de alertas (alertas.avaliar_regras) com uma avaliação
+força-bruta, regra a regra e fato a fato, sobre dados aleatórios pequenos.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import alertas
+from alertas import DIMENSOES, OPERADORES, QUALQUER, TODOS
+
+VALORES_DIMENSOES = {
+    'Motivo': ['Preço', 'Prazo', 'Não retornou contato'],
+    'Vendedor': ['A', 'B', 'C'],
+    'Canal': ['GoogleAds', 'MetaAds'],
+    'Periodo': ['2022-01', '2022-02', '2022-03'],
+}
+
+
+def _fatos_aleatorios(rng, n=400):
+    fatos = pd.DataFrame({'Metrica': rng.choice(['M0', 'M1', 'M2'], n)})
+    for dim, valores in VALORES_DIMENSOES.items():
+        fatos[dim] = rng.choice(valores + [TODOS], n)
+    # Valores inteiros pequenos: muitos empates entre si e com os limiares
+    fatos['Valor'] = rng.integers(-5, 6, n).astype(float)
+    return fatos.drop_duplicates(['Metrica', *DIMENSOES]).reset_index(drop=True)
+
+
+def _regras_aleatorias(rng, fatos, n=120):
+    amostra = fatos.sample(n, replace=True, random_state=int(rng.integers(1 << 31))).reset_index(drop=True)
+    operadores = np.resize(list(OPERADORES), n)  # todos os operadores aparecem
+    rng.shuffle(operadores)
+    regras = pd.DataFrame({
+        'Regra': [f'r{i}' for i in range(n)],
+        'Pagina': 'Teste',
+        'Tipo': rng.choice(['limiar', 'razao', 'variacao'], n, p=[0.6, 0.2, 0.2]),
+        'Metrica': amostra['Metrica'],
+        'Metrica_Base': rng.choice(['M0', 'M1'], n),
+        'Operador': operadores,
+        'Limiar': rng.integers(-3, 4, n).astype(float),
+        'Severidade': 'aviso',
+        'Mensagem': '{valor}',
+    })
+    # Filtro de cada dimensão: curinga, vazio (NaN ou '') ou o valor de um fato existente
+    for dim in DIMENSOES:
+        sorteio = rng.random(n)
+        regras[dim] = np.where(sorteio < 0.3, QUALQUER,
+                      np.where(sorteio < 0.45, '',
+                      np.where(sorteio < 0.6, None, amostra[dim].to_numpy(dtype=object))))
+    return regras
+
+
+def _forca_bruta(df_regras, fatos):
+    regras = alertas.preparar_regras(df_regras)
+    base, chave_regra = alertas._fatos_derivados(regras, fatos)
+    linhas = []
+    for regra, chave in zip(regras.itertuples(index=False), chave_regra):
+        comparar = OPERADORES[regra.Operador]
+        for fato in base.itertuples(index=False):
+            if fato.Chave != chave:
+                continue
+            if any(getattr(regra, dim) not in (QUALQUER, getattr(fato, dim)) for dim in DIMENSOES):
+                continue
+            if comparar(fato.Valor, regra.Limiar):
+                linhas.append((regra.Regra, fato.Metrica, *[getattr(fato, dim) for dim in DIMENSOES], fato.Valor))
+    return sorted(linhas)
+
+
+def _tuplas(df_alertas):
+    return sorted(df_alertas[['Regra', 'Metrica', *DIMENSOES, 'Valor']].itertuples(index=False, name=None))
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_avaliar_regras_igual_forca_bruta(semente):
+    rng = np.random.default_rng(semente)
+    fatos = _fatos_aleatorios(rng)
+    regras = _regras_aleatorias(rng, fatos)
+    esperado = _forca_bruta(regras, fatos)
+    assert esperado, 'dados de teste sem nenhum alerta'
+    assert _tuplas(alertas.avaliar_regras(regras, fatos)) == esperado
+
+
+@pytest.mark.parametrize('operador', list(OPERADORES))
+def test_cada_operador_com_filtros_fixo_vazio_e_curinga(operador):
+    fatos = pd.DataFrame({
+        'Metrica': 'M0',
+        'Motivo': TODOS,
+        'Vendedor': ['A', 'A', 'B', 'B', TODOS, TODOS],
+        'Canal': TODOS,
+        'Periodo': ['2022-01', '2022-02'] * 3,
+        'Valor': [1.0, 2.0, 2.0, 3.0, 3.0, 5.0],
+    })
+    regras = pd.DataFrame({
+        'Regra': ['fixo', 'vazio', 'curinga'],
+        'Pagina': 'Teste', 'Tipo': 'limiar', 'Metrica': 'M0',
+        'Operador': operador, 'Limiar': 2.0, 'Severidade': 'aviso', 'Mensagem': None,
+        'Vendedor': ['A', '', QUALQUER], 'Periodo': QUALQUER,
+    })
+    resultado = alertas.avaliar_regras(regras, fatos)
+    assert _tuplas(resultado) == _forca_bruta(regras, fatos)
+    # Cada filtro só enxerga os vendedores que lhe cabem
+    vendedores = resultado.groupby('Regra')['Vendedor'].agg(set).to_dict()
+    assert vendedores.get('fixo', {'A'}) <= {'A'}
+    assert vendedores.get('vazio', {TODOS}) <= {TODOS}
+
+
+def test_combinar_codigo_unico_por_combinacao():
+    rng = np.random.default_rng(0)
+    colunas = ['Chave', 'Vendedor', 'Periodo']
+    codigos_fatos = {c: rng.integers(0, 7, 500) for c in colunas}
+    codigos_regras = {c: rng.integers(0, 7, 80) for c in colunas}
+    grupo_fatos, grupo_regras = alertas._combinar(codigos_fatos, codigos_regras, colunas)
+    tuplas = list(zip(*[np.concatenate([codigos_fatos[c], codigos_regras[c]]) for c in colunas]))
+    grupos = np.concatenate([grupo_fatos, grupo_regras])
+    por_tupla = {}
+    for tupla, grupo in zip(tuplas, grupos):
+        assert por_tupla.setdefault(tupla, grupo) == grupo
+    assert len(set(por_tupla.values())) == len(por_tupla)
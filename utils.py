@@ -1,5 +1,12 @@
+import os
+import re
 import streamlit as st
 import pandas as pd
+import plotly.graph_objects as go
+import alertas
+import previsao
+import sketches
+from cache_tenants import CacheTenants
 
 # --- Funções de Formatação (Mantidas como no original) ---
 # Obs: A lógica de limpeza dentro destas funções pode ser redundante ou
@@ -53,11 +60,103 @@ def format_percentage(value):
     except (ValueError, TypeError, AttributeError):
         return "N/A"
 
+# --- Arquivos de Dados e Versionamento ---
+# Nome lógico do dataset -> arquivo CSV de origem
+ARQUIVOS_DADOS = {
+    'kpis': 'kpis_gerais.csv',
+    'midia': 'midia_canais.csv',
+    'performance': 'performance_vendedores.csv',
+    'perda': 'motivos_perda.csv',
+    'regras': 'regras_alerta.csv',
+    'receita_mensal': 'receita_mensal.csv', # Opcional: Mes (AAAA-MM), Vendedor, Canal, Receita (R$)
+    'leads': 'leads.csv', # Opcional: Data, Canal, Vendedor, ID Lead, ID Visitante, Tempo Conversão (dias)
+}
+TAMANHO_BLOCO_LEADS = 200000 # Linhas por bloco na ingestão de leads.csv
+
+# --- Tenants (unidades de negócio / bancos) ---
+# Cada tenant tem seu próprio conjunto de CSVs em <DADOS_RAIZ>/<tenant>/. O tenant padrão
+# usa os arquivos na raiz do projeto, então uma instalação sem tenants continua igual.
+TENANT_PADRAO = 'padrao'
+DADOS_RAIZ = os.environ.get('BRBANK_DADOS_RAIZ', 'dados')
+_NOME_TENANT = re.compile(r'^[A-Za-z0-9_-]+$') # Impede caminhos fora de DADOS_RAIZ
+# Configuração, não dados: o tenant sem arquivo próprio usa o da raiz do projeto
+DATASETS_COMPARTILHADOS = {'regras'}
+
+def listar_tenants():
+    # Tenant padrão + um tenant por subdiretório de DADOS_RAIZ
+    try:
+        subdiretorios = sorted(
+            nome for nome in os.listdir(DADOS_RAIZ)
+            if _NOME_TENANT.match(nome) and os.path.isdir(os.path.join(DADOS_RAIZ, nome))
+        )
+    except FileNotFoundError:
+        subdiretorios = []
+    return [TENANT_PADRAO] + [nome for nome in subdiretorios if nome != TENANT_PADRAO]
+
+def caminho_dataset(nome, tenant=None):
+    tenant = tenant or TENANT_PADRAO
+    if not _NOME_TENANT.match(tenant):
+        raise ValueError(f"Tenant inválido: '{tenant}'.")
+    if tenant == TENANT_PADRAO:
+        return ARQUIVOS_DADOS[nome]
+    caminho = os.path.join(DADOS_RAIZ, tenant, ARQUIVOS_DADOS[nome])
+    if nome in DATASETS_COMPARTILHADOS and not os.path.exists(caminho):
+        return ARQUIVOS_DADOS[nome]
+    return caminho
+
+def tenant_atual():
+    # Tenant escolhido na sessão (seletor_tenant) ou na URL (?tenant=...); senão o padrão
+    tenant = st.session_state.get('tenant') or st.query_params.get('tenant')
+    return tenant if tenant in listar_tenants() else TENANT_PADRAO
+
+def seletor_tenant():
+    # Seletor na barra lateral, exibido só quando há mais de um tenant; retorna o tenant ativo.
+    # Guarda a escolha em uma chave comum do session_state para valer em todas as páginas.
+    tenants = listar_tenants()
+    tenant = tenant_atual()
+    if len(tenants) > 1:
+        tenant = st.sidebar.selectbox("Unidade de Negócio", tenants, index=tenants.index(tenant))
+        st.session_state['tenant'] = tenant
+    return tenant
+
+def versao_dataset(nome, tenant=None):
+    # Identifica a versão atual do CSV (muda sempre que o arquivo é regravado).
+    # Usa apenas os metadados do arquivo, então é barato chamar a cada requisição.
+    try:
+        info = os.stat(caminho_dataset(nome, tenant))
+    except FileNotFoundError:
+        return None
+    return f"{info.st_mtime_ns:x}-{info.st_size:x}"
+
+def versoes_datasets(tenant=None):
+    # Versões de todos os datasets, para usar como chave de cache de cálculos que dependem de vários
+    return {nome: versao_dataset(nome, tenant) for nome in ARQUIVOS_DADOS}
+
+# --- Cache por Tenant ---
+# Substitui o st.cache_data (sem limite de tamanho) nos loaders, cálculos e figuras: as
+# entradas ficam separadas por tenant e limitadas pelos orçamentos abaixo (em MB), com
+# remoção LRU começando pelos tenants sem uso recente. Ver cache_tenants.py.
+ORCAMENTO_CACHE_GLOBAL_MB = int(os.environ.get('BRBANK_CACHE_GLOBAL_MB', 512))
+ORCAMENTO_CACHE_TENANT_MB = int(os.environ.get('BRBANK_CACHE_TENANT_MB', 128))
+cache_dados = CacheTenants(
+    ORCAMENTO_CACHE_GLOBAL_MB * 1024 * 1024,
+    ORCAMENTO_CACHE_TENANT_MB * 1024 * 1024,
+    tenant_padrao=TENANT_PADRAO,
+)
+
+def estatisticas_cache():
+    # Entradas, bytes, acertos, faltas e remoções por tenant (mais a linha 'Total')
+    return cache_dados.estatisticas()
+
 # --- Funções de Carregamento de Dados (Corrigidas e com Cache) ---
-@st.cache_data
-def load_kpis():
+# O parâmetro 'versao' não é usado na leitura: serve apenas para compor a chave do
+# cache, de modo que quem passar versao_dataset(...) recebe dados novos quando o CSV muda.
+# 'tenant' escolhe o conjunto de CSVs e o espaço do cache (None = tenant padrão). As páginas,
+# a API e o relatório sempre passam a versão, então nenhuma entrada do cache fica obsoleta.
+@cache_dados.memoizar()
+def load_kpis(versao=None, tenant=None):
     try:
-        df = pd.read_csv('kpis_gerais.csv').set_index('Metrica')
+        df = pd.read_csv(caminho_dataset('kpis', tenant)).set_index('Metrica')
         # --- CORREÇÃO ---
         # Converte a coluna 'Valor' diretamente para numérico.
         # Assume que o CSV usa '.' como decimal e não contém outros caracteres (R$, %).
@@ -75,10 +174,10 @@ def load_kpis():
         st.error(f"Erro ao carregar ou processar kpis_gerais.csv: {e}")
         return None
 
-@st.cache_data
-def load_midia():
+@cache_dados.memoizar()
+def load_midia(versao=None, tenant=None):
     try:
-        df = pd.read_csv('midia_canais.csv').set_index('Metrica')
+        df = pd.read_csv(caminho_dataset('midia', tenant)).set_index('Metrica')
         cols_to_convert_midia = ['MetaAds', 'GoogleAds', 'Total']
         nan_warning = False # Flag para aviso
         for col in cols_to_convert_midia:
@@ -102,10 +201,10 @@ def load_midia():
         st.error(f"Erro ao carregar ou processar midia_canais.csv: {e}")
         return None
 
-@st.cache_data
-def load_performance():
+@cache_dados.memoizar()
+def load_performance(versao=None, tenant=None):
     try:
-        df = pd.read_csv('performance_vendedores.csv')
+        df = pd.read_csv(caminho_dataset('performance', tenant))
         # Esta função já usava pd.to_numeric diretamente, o que é geralmente correto
         # se os dados no CSV estiverem em formato numérico padrão.
         cols_to_num = ['Leads Recebidos', 'Leads Convertidos', 'Leads Perdidos', 'Taxa Conversão (%)', 'Ticket Médio (R$)', 'Receita Total (R$)', 'Receita por Lead (R$)', 'Tempo Conversão (dias)']
@@ -128,10 +227,10 @@ def load_performance():
         st.error(f"Erro ao carregar ou processar performance_vendedores.csv: {e}")
         return None
 
-@st.cache_data
-def load_perda():
+@cache_dados.memoizar()
+def load_perda(versao=None, tenant=None):
     try:
-        df = pd.read_csv('motivos_perda.csv').set_index('Motivo')
+        df = pd.read_csv(caminho_dataset('perda', tenant)).set_index('Motivo')
          # Esta função também já usava pd.to_numeric diretamente.
         cols_to_num = ['A', 'B', 'C', 'D', 'E', 'Total']
         nan_warning = False
@@ -153,8 +252,309 @@ def load_perda():
         st.error(f"Erro ao carregar ou processar motivos_perda.csv: {e}")
         return None
 
+@cache_dados.memoizar()
+def load_regras_alerta(versao=None, tenant=None):
+    try:
+        # Colunas de filtro (Motivo, Vendedor, ...) são texto; vazio = agregado, '*' = cada grupo
+        df = pd.read_csv(caminho_dataset('regras', tenant), dtype=str, keep_default_na=False, na_values=[''])
+        return alertas.preparar_regras(df)
+    except FileNotFoundError:
+        # Sem arquivo de regras o dashboard funciona normalmente, apenas sem alertas
+        return None
+    except Exception as e:
+        st.error(f"Erro ao carregar ou processar regras_alerta.csv: {e}")
+        return None
+
+@cache_dados.memoizar()
+def load_receita_mensal(versao=None, tenant=None):
+    try:
+        df = pd.read_csv(caminho_dataset('receita_mensal', tenant), dtype={'Mes': str, 'Vendedor': str, 'Canal': str})
+        df['Receita (R$)'] = pd.to_numeric(df['Receita (R$)'], errors='coerce')
+        if df['Receita (R$)'].isnull().any():
+             st.warning("Atenção: Alguns valores de 'Receita (R$)' em receita_mensal.csv não puderam ser convertidos para número e foram ignorados.")
+        mes_valido = pd.to_datetime(df['Mes'], format='%Y-%m', errors='coerce').notna()
+        if not mes_valido.all():
+             st.warning("Atenção: Algumas linhas de receita_mensal.csv têm 'Mes' fora do formato AAAA-MM e foram ignoradas.")
+        return df[mes_valido].dropna(subset=['Receita (R$)'])
+    except FileNotFoundError:
+        # Arquivo opcional: sem ele as projeções usam a média mensal do período
+        return None
+    except Exception as e:
+        st.error(f"Erro ao carregar ou processar receita_mensal.csv: {e}")
+        return None
+
+# Sem cópia a cada rerun: as consultas em SketchesLeads não alteram o objeto
+@cache_dados.memoizar(copiar=False)
+def load_sketches_leads(versao=None, tenant=None):
+    try:
+        # Lê os leads em blocos e mantém apenas os sketches por partição (período x canal x vendedor)
+        sketches_leads = sketches.SketchesLeads()
+        for bloco in pd.read_csv(caminho_dataset('leads', tenant), dtype=str, chunksize=TAMANHO_BLOCO_LEADS):
+            bloco['Periodo'] = bloco['Data'].str[:7] # AAAA-MM
+            sketches_leads.ingerir(bloco)
+        return sketches_leads
+    except FileNotFoundError:
+        # Arquivo opcional: sem ele as páginas mostram apenas as médias pré-calculadas
+        return None
+    except Exception as e:
+        st.error(f"Erro ao carregar ou processar leads.csv: {e}")
+        return None
+
+# --- Alertas (Motor de Regras) ---
+@cache_dados.memoizar()
+def calcular_alertas(versoes, tenant=None):
+    # 'versoes' (ver versoes_datasets) só compõe a chave do cache: recalcula quando algum CSV muda
+    df_regras = load_regras_alerta(versoes.get('regras'), tenant=tenant)
+    if df_regras is None:
+        return pd.DataFrame(columns=alertas.COLUNAS_ALERTAS)
+    fatos = alertas.montar_fatos(
+        load_kpis(versoes.get('kpis'), tenant=tenant),
+        load_midia(versoes.get('midia'), tenant=tenant),
+        load_performance(versoes.get('performance'), tenant=tenant),
+        load_perda(versoes.get('perda'), tenant=tenant),
+    )
+    return alertas.avaliar_regras(df_regras, fatos)
+
+# Regra de regras_alerta.csv que substitui a legenda de LTV/CAC saudável quando dispara
+REGRA_LTV_CAC = 'ltv_cac_baixo'
+
+def alerta_ltv_cac_disparado(df_alertas):
+    # Só a regra de LTV/CAC decide a legenda "saudável"; outros alertas da página não contam
+    return bool((df_alertas['Regra'] == REGRA_LTV_CAC).any())
+
+def exibir_alertas(df_alertas, pagina):
+    # Mostra os alertas da página conforme a severidade; retorna quantos foram exibidos
+    alertas_pagina = df_alertas[df_alertas['Pagina'] == pagina]
+    for severidade, mensagem in zip(alertas_pagina['Severidade'], alertas_pagina['Mensagem']):
+        if severidade == 'info':
+            st.info(mensagem)
+        elif severidade == 'nota':
+            st.caption(mensagem)
+        else:
+            st.warning(mensagem)
+    return len(alertas_pagina)
+
+# --- Métricas Derivadas (usadas pelas páginas e pela API) ---
+def calcular_ranking_vendedores(df_performance):
+    # Ordena os vendedores pela Receita Total e adiciona posição e participação na receita
+    df = df_performance.sort_values(by='Receita Total (R$)', ascending=False).reset_index(drop=True)
+    df.insert(0, 'Posição', range(1, len(df) + 1))
+    receita_total = df['Receita Total (R$)'].sum()
+    df['Participação na Receita (%)'] = (df['Receita Total (R$)'] / receita_total * 100).round(2) if receita_total > 0 else pd.NA
+    return df
+
+def calcular_perdas_por_motivo(df_perda):
+    # Total de perdas por motivo (maior -> menor) e participação de cada motivo no total
+    df = df_perda[['Total']].dropna().sort_values(by='Total', ascending=False)
+    total_perdas = df['Total'].sum()
+    df['Participação nas Perdas (%)'] = (df['Total'] / total_perdas * 100).round(2) if total_perdas > 0 else pd.NA
+    return df
+
+# --- Metas e Projeções ---
+META_FATURAMENTO_ANUAL = 30000000
+MESES_PERIODO_ATUAL = 6 # Set/22 a Fev/23
+
+def calcular_projecao_anual(receita_total, meses=MESES_PERIODO_ATUAL):
+    # Projeção linear: média mensal do período * 12
+    return (receita_total / meses) * 12 if meses > 0 else 0
+
+def montar_series_receita(df_mensal=None, df_kpis=None, df_performance=None, meses=MESES_PERIODO_ATUAL):
+    # Matriz de receita mensal (linhas = (Tipo, Serie), colunas = meses em ordem) para a previsão.
+    # Com receita_mensal.csv: empresa, cada vendedor e cada canal. Sem ele: a receita total
+    # da empresa e de cada vendedor distribuída igualmente nos meses do período.
+    if df_mensal is not None and not df_mensal.empty:
+        partes = [df_mensal.assign(Tipo='Empresa', Serie='Empresa')]
+        for dim in ['Vendedor', 'Canal']:
+            if dim in df_mensal.columns:
+                partes.append(df_mensal.dropna(subset=[dim]).assign(Tipo=dim, Serie=lambda d, dim=dim: d[dim]))
+        longo = pd.concat(partes, ignore_index=True)
+        longo['Mes'] = pd.PeriodIndex(longo['Mes'], freq='M')
+        series = longo.pivot_table(index=['Tipo', 'Serie'], columns='Mes', values='Receita (R$)', aggfunc='sum')
+        # Meses consecutivos: um mês sem nenhum dado vira coluna NaN em vez de sumir
+        meses_periodo = pd.period_range(series.columns.min(), series.columns.max(), freq='M', name='Mes')
+        return series.reindex(columns=meses_periodo), 'Série mensal'
+
+    totais = []
+    if df_kpis is not None and 'Receita Total (R$)' in df_kpis.index:
+        totais.append(('Empresa', 'Empresa', df_kpis.loc['Receita Total (R$)', 'Valor']))
+    if df_performance is not None and 'Receita Total (R$)' in df_performance.columns:
+        totais += [('Vendedor', v, r) for v, r in zip(df_performance['Vendedor'], df_performance['Receita Total (R$)'])]
+    df_totais = pd.DataFrame(totais, columns=['Tipo', 'Serie', 'Receita']).dropna()
+    media_mensal = df_totais['Receita'].to_numpy(dtype=float)[:, None] / meses
+    series = pd.DataFrame(media_mensal.repeat(meses, axis=1), index=pd.MultiIndex.from_frame(df_totais[['Tipo', 'Serie']]))
+    return series, 'Média do período'
+
+@cache_dados.memoizar()
+def calcular_previsoes(versoes, tenant=None):
+    # Projeção anual de todas as séries (empresa, vendedores, canais) de uma vez.
+    # 'versoes' (ver versoes_datasets) só compõe a chave do cache.
+    series, base = montar_series_receita(
+        load_receita_mensal(versoes.get('receita_mensal'), tenant=tenant),
+        load_kpis(versoes.get('kpis'), tenant=tenant),
+        load_performance(versoes.get('performance'), tenant=tenant),
+    )
+    if series.empty:
+        return pd.DataFrame(columns=['Tipo', 'Serie', 'Realizado', 'Tendência Mensal', 'Projeção Anual', 'Meses', 'Base'])
+    df = previsao.projetar_receitas(series)
+    df['Base'] = base
+    return df
+
+def projecao_anual_empresa(df_previsoes, receita_total):
+    # Projeção da empresa pela previsão; sem ela, volta para a projeção linear
+    empresa = df_previsoes.loc[df_previsoes['Tipo'] == 'Empresa', 'Projeção Anual']
+    return float(empresa.iloc[0]) if not empresa.empty else calcular_projecao_anual(receita_total)
+
+def calcular_ritmo_vendedores(df_previsoes, meta=META_FATURAMENTO_ANUAL):
+    # Ritmo de cada vendedor vs sua parte da meta anual (meta dividida igualmente entre a equipe)
+    df = df_previsoes[df_previsoes['Tipo'] == 'Vendedor'].rename(columns={'Serie': 'Vendedor'})
+    df = df[['Vendedor', 'Realizado', 'Projeção Anual']].reset_index(drop=True)
+    df['Meta Anual'] = meta / len(df) if len(df) > 0 else pd.NA
+    df['Ritmo vs Meta (%)'] = (df['Projeção Anual'] / df['Meta Anual'] * 100).round(1)
+    return df.sort_values(by='Ritmo vs Meta (%)', ascending=False)
+
+# --- Blocos do Modo Executivo (páginas e relatório estático) ---
+# Valores já formatados para exibição: as páginas os mostram com st.metric / st.dataframe e
+# o relatório (relatorio.py) os converte em HTML, para que as duas visões não divirjam.
+def potencial_receita_leads_ativos(df_kpis):
+    # Leads Ativos * Tx. Conv. Histórica (L→C) * Ticket Médio; None se faltar algum KPI
+    valores = [df_kpis['Valor'].get(kpi) for kpi in ['Leads Ativos para Follow-up', 'Taxa de Conversão Leads → Clientes (%)', 'Ticket Médio (R$)']]
+    if not all(pd.notna(v) for v in valores):
+        return None
+    leads_ativos, tx_conv_hist_pct, ticket_medio = valores
+    return leads_ativos * (tx_conv_hist_pct / 100.0) * ticket_medio
+
+def metricas_leads_aquisicao(sketches_leads, canal='Todos'):
+    # (rótulo, valor, ajuda) das contagens distintas de leads.csv no canal; somáveis entre canais sem dupla contagem
+    if sketches_leads is None:
+        return []
+    resumo = sketches_leads.resumo(canais=None if canal == 'Todos' else canal).iloc[0]
+    return [
+        ("Visitantes que Viraram Lead (estim.)", f"{int(resumo['Visitantes que Viraram Lead (estim.)']):,}",
+         "Visitantes distintos presentes em leads.csv (não é o total de visitantes do site do funil), estimados por HyperLogLog (erro ~2%)."),
+        ("Leads Únicos (estim.)", f"{int(resumo['Leads Únicos (estim.)']):,}", "Leads distintos estimados por HyperLogLog (erro ~2%)."),
+    ]
+
+def metricas_leads_retencao(sketches_leads):
+    # (rótulo, valor, ajuda) da distribuição do tempo de conversão e dos leads únicos de leads.csv
+    if sketches_leads is None:
+        return []
+    resumo = sketches_leads.resumo().iloc[0]
+    p50, p90 = resumo['Tempo Conversão p50 (dias)'], resumo['Tempo Conversão p90 (dias)']
+    return [
+        ("Tempo Conversão (Mediana)", f"{p50:.1f} dias" if pd.notna(p50) else "N/A", "Metade das conversões acontece em até este tempo (p50)."),
+        ("Tempo Conversão (p90)", f"{p90:.1f} dias" if pd.notna(p90) else "N/A", "90% das conversões acontecem em até este tempo."),
+        ("Leads Únicos (estim.)", f"{int(resumo['Leads Únicos (estim.)']):,}", "Contagem distinta aproximada (erro ~2%) a partir de leads.csv."),
+    ]
+
+def tabela_ranking_vendedores(df_performance):
+    # Posição por receita e participação de cada vendedor, formatadas (mesmo cálculo da API: /api/ranking_vendedores)
+    df = calcular_ranking_vendedores(df_performance)[['Posição', 'Vendedor', 'Receita Total (R$)', 'Participação na Receita (%)']]
+    df['Receita Total (R$)'] = df['Receita Total (R$)'].map(format_currency)
+    df['Participação na Receita (%)'] = df['Participação na Receita (%)'].map(format_percentage)
+    return df
+
+def destaques_vendedores(df_performance):
+    # Melhor e pior vendedor em cada indicador: duas listas de (rótulo, vendedor, valor formatado)
+    dias = lambda x: f"{x:.0f} dias"
+    melhores, piores = [], []
+    for rotulo_melhor, rotulo_pior, coluna, maior_melhor, formatar in [
+        ("Taxa Conversão", "Taxa Conversão", 'Taxa Conversão (%)', True, format_percentage),
+        ("Receita Total", "Receita Total", 'Receita Total (R$)', True, format_currency),
+        ("Ticket Médio", "Ticket Médio", 'Ticket Médio (R$)', True, format_currency),
+        ("Tempo Médio Conv. (Mais Rápido)", "Tempo Médio Conv. (Mais Lento)", 'Tempo Conversão (dias)', False, dias),
+    ]:
+        serie = df_performance.set_index('Vendedor')[coluna].dropna() if coluna in df_performance.columns else pd.Series(dtype=float)
+        if serie.empty:
+            melhores.append((rotulo_melhor, "N/A", "N/A"))
+            piores.append((rotulo_pior, "N/A", "N/A"))
+            continue
+        melhor = serie.idxmax() if maior_melhor else serie.idxmin()
+        pior = serie.idxmin() if maior_melhor else serie.idxmax()
+        melhores.append((rotulo_melhor, melhor, formatar(serie[melhor])))
+        piores.append((rotulo_pior, pior, formatar(serie[pior])))
+    return melhores, piores
+
+def tabela_ritmo_vendedores(df_previsoes):
+    # Ritmo vs meta por vendedor (calcular_ritmo_vendedores) com valores formatados
+    df = calcular_ritmo_vendedores(df_previsoes)
+    for col in ['Realizado', 'Projeção Anual', 'Meta Anual']:
+        df[col] = df[col].map(format_currency)
+    df['Ritmo vs Meta (%)'] = df['Ritmo vs Meta (%)'].map(format_percentage)
+    return df
+
+# --- Gráficos Compartilhados (páginas e relatório estático) ---
+# Paleta Azul Pastel usada em todo o dashboard (do mais claro ao mais escuro)
+azul_pastel_palette = ['#E1F5FE', '#B3E5FC', '#81D4FA', '#4FC3F7', '#29B6F6']
+
+def criar_grafico_velocimetro(receita_total, projecao_anual, meta=META_FATURAMENTO_ANUAL):
+    # Define cores pastel azul (LightCyan, LightBlue, LightSkyBlue) com alpha
+    cor_step1 = 'rgba(225, 245, 254, 0.6)' # Light Cyan 50 com alpha
+    cor_step2 = 'rgba(179, 229, 252, 0.7)' # Light Blue 100 com alpha
+    cor_step3 = 'rgba(129, 212, 250, 0.8)' # Light Blue 200 com alpha
+    cor_barra = '#81D4FA' # Light Blue 200 sólido
+
+    fig_gauge = go.Figure(go.Indicator(
+        mode = "gauge+number",
+        value = receita_total,
+        number = {'prefix': "R$", 'valueformat': ',.0f'},
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        gauge = {
+            'axis': {'range': [0, meta], 'tickwidth': 1, 'tickcolor': "darkblue"},
+            'bar': {'color': cor_barra}, # Cor da barra principal
+            'bgcolor': "white",
+            'borderwidth': 1,
+            'bordercolor': "gray",
+            'steps': [ # Escala de Azul Pastel (claro -> escuro) com transparência
+                {'range': [0, meta * 0.5], 'color': cor_step1},
+                {'range': [meta * 0.5, meta * 0.8], 'color': cor_step2},
+                {'range': [meta * 0.8, meta], 'color': cor_step3}
+                ],
+            'threshold': {
+                'line': {'color': "orange", 'width': 4}, # Linha laranja para projeção (bom contraste com azul)
+                'thickness': 0.75,
+                'value': projecao_anual if pd.notna(projecao_anual) else 0
+                }
+            }
+        ))
+    fig_gauge.update_layout(height=250, margin=dict(t=10, b=10, l=30, r=30))
+    return fig_gauge
+
+FUNIL_KPIS = ['Impressões dos Anúncios', 'Visitantes no site', 'Cliques no Anúncio', 'Leads Cadastrados no CRM', 'Leads Convertidos']
+FUNIL_ETAPAS = ['Impressões', 'Visitantes', 'Cliques', 'Leads CRM', 'Clientes (Vendas)']
+
+def criar_grafico_funil(df_kpis):
+    # Retorna None se não houver etapas válidas (> 0) para exibir
+    funnel_data = {
+        'Etapa': FUNIL_ETAPAS,
+        'Valor': [ df_kpis.loc[kpi, 'Valor'] for kpi in FUNIL_KPIS ]
+    }
+    df_funnel = pd.DataFrame(funnel_data).dropna(subset=['Valor'])
+    df_funnel = df_funnel[df_funnel['Valor'] > 0]
+    df_funnel['Valor'] = df_funnel['Valor'].astype(int)
+    if df_funnel.empty:
+        return None
+
+    funnel_colors = azul_pastel_palette[::-1] # Inverte para funil (mais escuro no topo)
+    fig_funnel = go.Figure(go.Funnel(
+        y = df_funnel['Etapa'], x = df_funnel['Valor'],
+        textposition = "inside", textinfo = "value+percent previous",
+        opacity = 0.8, marker = {"color": funnel_colors[0:len(df_funnel)]}, # Usa paleta azul pastel
+        connector = {"line": {"color": "silver", "dash": "dot", "width": 2}}))
+    fig_funnel.update_layout(title_text="Visualização do Funil", margin=dict(t=50, l=0, r=0, b=0), height=400)
+    return fig_funnel
+
+# Figuras prontas por tenant: ficam no mesmo cache (e orçamento) que os DataFrames
+@cache_dados.memoizar(copiar=False)
+def figura_velocimetro(receita_total, projecao_anual, tenant=None):
+    return criar_grafico_velocimetro(receita_total, projecao_anual)
+
+@cache_dados.memoizar(copiar=False)
+def figura_funil(versao=None, tenant=None):
+    df_kpis = load_kpis(versao, tenant=tenant)
+    return criar_grafico_funil(df_kpis) if df_kpis is not None else None
+
 # --- Função para Download de DataFrame como CSV (Mantida como no original) ---
-@st.cache_data # Cacheia a conversão para não refazer toda hora
+@st.cache_data(max_entries=64) # Cacheia a conversão para não refazer toda hora (com limite, já que a chave é o conteúdo)
 def convert_df_to_csv(df_to_convert):
     # IMPORTANT: Cache the conversion to prevent computation on every rerun
     # Garante que o índice seja incluído se ele tiver nome (como 'Motivo' ou 'Metrica')